@@ -23,6 +23,50 @@ Example:
          content="Hello there! \U0001f62e", embeds=[embed]).execute()
 
 """
+import importlib.util
+import logging
 
 from .hook import Hook
+from .attachment import Attachment
+from .transport import Transport
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+from .metrics import Instrumentation, Instruments, MetricsCollector, SendEvent, StatsDExporter
+from .dispatcher import Dispatcher
+from .batcher import Batcher
+from .outbox import Outbox
+from .broadcast import broadcast, broadcast_async
+from .splitter import split_fields, split_hook, split_text
+from .template import EmbedTemplate
+from .bulk import BulkBuilder, records_from_columns
+from .dedup import Deduplicator
+from .messages import MessageIndex
+from .pipeline import ProcessPipeline
+from .raw import RawSender
 from .embed import Embed, EmbedAuthor, EmbedField, EmbedFooter, EmbedImage, EmbedThumbnail, Color
+
+# the application configures the logging (e.g. logging.basicConfig), the package only emits the records
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+__all__ = [
+    'Hook', 'Attachment', 'Transport', 'RateLimiter', 'RetryPolicy',
+    'Instrumentation', 'Instruments', 'MetricsCollector', 'SendEvent', 'StatsDExporter',
+    'Dispatcher', 'Batcher', 'Outbox', 'broadcast', 'broadcast_async', 'split_fields', 'split_hook', 'split_text',
+    'EmbedTemplate', 'BulkBuilder', 'records_from_columns', 'Deduplicator', 'MessageIndex', 'ProcessPipeline',
+    'RawSender', 'Embed', 'EmbedAuthor', 'EmbedField', 'EmbedFooter', 'EmbedImage', 'EmbedThumbnail', 'Color',
+]
+# without aiohttp, `from DiscordHooks import *` still works, it just doesn't get AsyncTransport
+if importlib.util.find_spec('aiohttp') is not None:
+    __all__.append('AsyncTransport')
+
+
+def __getattr__(name: str):
+    # AsyncTransport imports asyncio and aiohttp, so it is only imported when it is used
+    if name == 'AsyncTransport':
+        from .async_transport import AsyncTransport
+        return AsyncTransport
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | {'AsyncTransport'})
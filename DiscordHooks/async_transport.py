@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import time
+import weakref
+
+from .metrics import Instrumentation, SendEvent, body_size
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - aiohttp is an optional dependency
+    aiohttp = None
+
+
+class AsyncResponse:
+    """The response of a request sent with the AsyncTransport
+
+    The body is read before the connection is released to the pool,
+    so the response can be used after the request is done.
+
+    Attributes:
+        status_code (int): The HTTP status code of the response.
+        headers (dict): The headers of the response (case-insensitive).
+        content (bytes): The body of the response.
+    """
+
+    def __init__(self, status_code: int, headers: dict, content: bytes):
+        """Initiate the AsyncResponse object
+
+        Args:
+            status_code (int): The HTTP status code of the response.
+            headers (dict): The headers of the response.
+            content (bytes): The body of the response.
+        """
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        """Decode the body of the response as json
+
+        Returns:
+            The decoded body.
+        """
+        return json.loads(self.content)
+
+    def __repr__(self):
+        return '<AsyncResponse [{}]>'.format(self.status_code)
+
+
+class AsyncTransport:
+    """Non-blocking pooled HTTP transport for executing webhooks with asyncio
+
+    Holds one aiohttp.ClientSession, so all the hooks sent with the transport share its
+    pool of keep-alive connections, and many sends can be in flight at once on a single thread.
+
+    Note:
+        Requires aiohttp (pip install DiscordHooks[async]).
+        The session is created on the first send, and is bound to the event loop that is running then.
+
+    Sends are paced by a RateLimiter, so they wait for their turn in the webhook's
+    rate limit bucket instead of being answered with 429, and the timeouts and retries
+    of failed sends are set by a RetryPolicy. An Instrumentation records the timings of every send.
+
+    Attributes:
+        limit (int): The maximum number of connections open at once. 0 for no limit.
+        limit_per_host (int): The maximum number of connections open at once to the same host. 0 for no limit.
+        keep_alive (bool): False to close the connection after every request.
+        rate_limiter (RateLimiter): The rate limiter pacing the sends.
+        retry_policy (RetryPolicy): The timeouts and retries of the sends.
+        instrumentation (Instrumentation): Records the timings of every send. None to record nothing.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 0, keep_alive: bool = True,
+                 rate_limiter: RateLimiter = None, retry_policy: RetryPolicy = None,
+                 instrumentation: Instrumentation = None):
+        """Initiate the AsyncTransport object
+
+        Args:
+            limit (int): The maximum number of connections open at once. 0 for no limit.
+            limit_per_host (int): The maximum number of connections open at once to the same host. 0 for no limit.
+            keep_alive (bool): False to close the connection after every request.
+            rate_limiter (RateLimiter): The rate limiter pacing the sends. A new one when not set.
+                Transports that send to the same webhooks should share a rate limiter.
+            retry_policy (RetryPolicy): The timeouts and retries of the sends. The default policy when not set.
+            instrumentation (Instrumentation): Records the timings of every send. None to record nothing.
+        """
+        if aiohttp is None:
+            raise ImportError('AsyncTransport requires aiohttp (pip install DiscordHooks[async])')
+        if not isinstance(limit, int) or limit < 0:
+            raise ValueError('limit must be a non negative int')
+        if not isinstance(limit_per_host, int) or limit_per_host < 0:
+            raise ValueError('limit_per_host must be a non negative int')
+        if instrumentation is not None and not isinstance(instrumentation, Instrumentation):
+            raise TypeError('instrumentation must be Instrumentation')
+
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keep_alive = keep_alive
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.instrumentation = instrumentation
+
+        self._session = None
+
+    @property
+    def session(self) -> 'aiohttp.ClientSession':
+        """aiohttp.ClientSession: The pooled session of the transport."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             force_close=not self.keep_alive)
+            timeout = aiohttp.ClientTimeout(sock_connect=self.retry_policy.connect_timeout,
+                                            sock_read=self.retry_policy.read_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def post(self, url: str, data=None, headers: dict = None, event: SendEvent = None) -> AsyncResponse:
+        """Send a POST request over the pooled connections (see request)
+
+        Args:
+            url (str): The url the request will be sent to.
+            data (str): The body of the request.
+            headers (dict): Extra headers of the request.
+            event (SendEvent): The measurements of the send so far, completed and recorded by the instrumentation.
+
+        Returns:
+            AsyncResponse: The response of the server.
+        """
+        return await self.request('POST', url, data, headers, event)
+
+    async def request(self, method: str, url: str, data=None, headers: dict = None,
+                      event: SendEvent = None) -> AsyncResponse:
+        """Send a request over the pooled connections
+
+        The request waits for its turn in the url's rate limit bucket, and is retried if it is throttled anyway.
+        Connection errors, timeouts and retryable status codes are retried according to the retry policy.
+
+        Args:
+            method (str): The HTTP method of the request (POST, PATCH, DELETE...).
+            url (str): The url the request will be sent to.
+            data (str): The body of the request.
+            headers (dict): Extra headers of the request.
+            event (SendEvent): The measurements of the send so far, completed and recorded by the instrumentation.
+
+        Returns:
+            AsyncResponse: The response of the server.
+
+        Raises:
+            aiohttp.ClientConnectionError: If the last attempt failed to connect.
+            asyncio.TimeoutError: If the last attempt timed out.
+        """
+        if self.instrumentation is None:
+            return await self._request(method, url, data, headers, None)
+
+        if event is None:
+            event = SendEvent(url)
+        event.url = url
+        try:
+            response = await self._request(method, url, data, headers, event)
+        except Exception as e:
+            event.exception = e
+            raise
+        else:
+            event.status_code = response.status_code
+            return response
+        finally:
+            self.instrumentation.record(event)
+
+    async def _request(self, method: str, url: str, data, headers: dict, event: SendEvent) -> AsyncResponse:
+        attempts = self.retry_policy.start(url, self.rate_limiter)
+        size = body_size(data) if event is not None else None
+        while True:
+            delay = self.rate_limiter.reserve(url)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                if event is not None:
+                    event.rate_limit_wait += delay
+
+            started = time.perf_counter()
+            try:
+                async with self.session.request(method, url, data=data, headers=headers) as response:
+                    content = await response.read()
+                    result = AsyncResponse(response.status, response.headers.copy(), content)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if event is not None:
+                    event.add_attempt(time.perf_counter() - started, size)
+                delay = attempts.next_delay(exception=e)
+                if delay is None:
+                    raise
+            else:
+                if event is not None:
+                    event.add_attempt(time.perf_counter() - started, size)
+                if self.rate_limiter.update(url, result) is not None:
+                    # throttled, the next reserve waits for the bucket, unless that passes the deadline
+                    if attempts.throttle(result, attempts.throttled < self.rate_limiter.max_retries) is None:
+                        return result
+                    continue
+                delay = attempts.next_delay(response=result)
+                if delay is None:
+                    return result
+            await asyncio.sleep(delay)
+            if event is not None:
+                event.retry_wait += delay
+
+    async def close(self):
+        """Close the session and all its pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> 'AsyncTransport':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+_default_transports = weakref.WeakKeyDictionary()
+
+
+def default_async_transport() -> AsyncTransport:
+    """Get the async transport used by hooks that are not given one
+
+    Every event loop gets its own transport, created on the first call from it.
+    Close it with `await default_async_transport().close()` before the loop is closed.
+
+    Returns:
+        AsyncTransport: The default transport of the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    transport = _default_transports.get(loop)
+    if transport is None:
+        transport = _default_transports[loop] = AsyncTransport()
+    return transport
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import threading
+
+MAX_FILES = 10
+MAX_UPLOAD_SIZE = 25 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# held around every seek and read of a seekable file object, which may be read by several sends at once
+_read_lock = threading.Lock()
+
+
+class Attachment:
+    """A file attached to a webhook message
+
+    The contents are streamed in chunks when the message is sent, so a big file is never held in memory.
+
+    The source of the contents may be:
+        bytes: the contents themselves.
+        str or os.PathLike: the path of a file, opened when the message is sent.
+        file object: a binary file object; a seekable one is read from its current position on every send,
+            and several sends (a broadcast, a retry, the same hook queued twice) may read it at once.
+        iterable of bytes: read once, so the message can't be retried; its size is unknown unless given.
+
+    Attributes:
+        source: The source of the contents.
+        filename (str): The name of the file in Discord.
+        content_type (str): The MIME type of the file.
+        size (int): The size of the file in bytes, None if it is unknown.
+    """
+    __slots__ = ('source', 'filename', 'content_type', 'size', '_start')
+
+    def __init__(self, source, filename: str = None, content_type: str = 'application/octet-stream',
+                 size: int = None):
+        """Initiate the Attachment object
+
+        Args:
+            source: The source of the contents (bytes, a path, a binary file object or an iterable of bytes).
+            filename (str): The name of the file in Discord. The name of the source file when not set.
+            content_type (str): The MIME type of the file.
+            size (int): The size of the file in bytes, for an iterable source.
+        """
+        if filename is not None and not isinstance(filename, str):
+            raise TypeError('filename must be string')
+        if not isinstance(content_type, str):
+            raise TypeError('content_type must be string')
+
+        self.source = source
+        self._start = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            size = len(source)
+        elif isinstance(source, (str, os.PathLike)):
+            size = os.path.getsize(source)
+            filename = filename or os.path.basename(os.fspath(source))
+        elif hasattr(source, 'read'):
+            if isinstance(getattr(source, 'name', None), str):
+                filename = filename or os.path.basename(source.name)
+            if getattr(source, 'seekable', lambda: False)():
+                self._start = source.tell()
+                size = source.seek(0, io.SEEK_END) - self._start
+                source.seek(self._start)
+        elif not hasattr(source, '__iter__'):
+            raise TypeError('source must be bytes, path, file object or iterable of bytes')
+
+        self.filename = filename or 'file'
+        self.content_type = content_type
+        self.size = size
+
+    @property
+    def replayable(self) -> bool:
+        """bool: True if the contents can be read again (for a retry), and by several sends at once."""
+        return isinstance(self.source, (bytes, bytearray, memoryview, str, os.PathLike)) or self._start is not None
+
+    def chunks(self, chunk_size: int = CHUNK_SIZE):
+        """Read the contents in chunks
+
+        Args:
+            chunk_size (int): The maximum size of each chunk in bytes.
+
+        Yields:
+            bytes: The next chunk of the contents.
+        """
+        source = self.source
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source)
+            for offset in range(0, len(view), chunk_size):
+                yield bytes(view[offset:offset + chunk_size])
+        elif isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as file:
+                yield from iter(lambda: file.read(chunk_size), b'')
+        elif hasattr(source, 'read'):
+            if self._start is None:
+                yield from iter(lambda: source.read(chunk_size), b'')
+                return
+            # every chunk is read at its own offset, so sends that share the file don't move each other's position
+            offset = self._start
+            while True:
+                with _read_lock:
+                    source.seek(offset)
+                    chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                yield chunk
+        else:
+            for chunk in source:
+                yield bytes(chunk)
+
+    @staticmethod
+    def of(file) -> 'Attachment':
+        """Get the attachment of a file given in any of the supported forms
+
+        Args:
+            file: An Attachment, or a source of one.
+
+        Returns:
+            Attachment: The attachment.
+        """
+        return file if isinstance(file, Attachment) else Attachment(file)
+
+
+class MultipartBody:
+    """A multipart/form-data request body with payload_json and attachments
+
+    Iterating over the body streams it chunk by chunk, and it can be iterated again
+    (for a retry) as long as all the attachments are replayable.
+
+    Attributes:
+        payload_json (bytes): The json payload of the message.
+        attachments ([Attachment]): The attached files.
+        boundary (str): The multipart boundary.
+    """
+
+    def __init__(self, payload_json: bytes, attachments: [Attachment]):
+        """Initiate the MultipartBody object
+
+        Args:
+            payload_json (bytes): The json payload of the message.
+            attachments ([Attachment]): The attached files.
+        """
+        self.payload_json = payload_json
+        self.attachments = attachments
+        self.boundary = os.urandom(16).hex()
+        self._iterated = False
+
+    @property
+    def content_type(self) -> str:
+        """str: The Content-Type header of the body."""
+        return 'multipart/form-data; boundary={}'.format(self.boundary)
+
+    @property
+    def len(self) -> int:
+        """int: The size of the body in bytes, None if the size of an attachment is unknown.
+
+        (named like the requests-toolbelt encoders, so requests sends it as the Content-Length)
+        """
+        if any(attachment.size is None for attachment in self.attachments):
+            return None
+        return (sum(len(head) + len(tail) for head, tail in self._parts())
+                + len(self.payload_json) + sum(attachment.size for attachment in self.attachments)
+                + len(self._end()))
+
+    def __iter__(self):
+        if self._iterated and not all(attachment.replayable for attachment in self.attachments):
+            raise RuntimeError('the attachments can only be read once')
+        self._iterated = True
+
+        parts = self._parts()
+        head, tail = parts[0]
+        yield head + self.payload_json + tail
+        for attachment, (head, tail) in zip(self.attachments, parts[1:]):
+            yield head
+            yield from attachment.chunks()
+            yield tail
+        yield self._end()
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        for chunk in self:
+            yield chunk
+
+    def _parts(self) -> [(bytes, bytes)]:
+        parts = [('--{}\r\nContent-Disposition: form-data; name="payload_json"\r\n'
+                  'Content-Type: application/json\r\n\r\n'.format(self.boundary).encode('utf-8'), b'\r\n')]
+        for index, attachment in enumerate(self.attachments):
+            filename = attachment.filename.replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+            head = ('--{}\r\nContent-Disposition: form-data; name="files[{}]"; filename="{}"\r\n'
+                    'Content-Type: {}\r\n\r\n'.format(self.boundary, index, filename, attachment.content_type))
+            parts.append((head.encode('utf-8'), b'\r\n'))
+        return parts
+
+    def _end(self) -> bytes:
+        return '--{}--\r\n'.format(self.boundary).encode('utf-8')
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from concurrent.futures import Future
+
+from .dispatcher import Dispatcher
+from .hook import Hook
+from .splitter import MAX_CONTENT_LENGTH, MAX_EMBEDS, MAX_EMBEDS_LENGTH
+from .transport import Transport
+
+
+class _Batch:
+    """Hooks waiting to be merged into one message"""
+    __slots__ = ('deadline', 'hooks', 'futures', 'content_length', 'embeds', 'length')
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.hooks = []
+        self.futures = []
+        self.content_length = 0
+        self.embeds = 0
+        self.length = 0
+
+    def fits(self, hook: Hook) -> bool:
+        if hook.content:
+            # the contents are joined with a newline
+            length = self.content_length + len(hook.content) + (1 if self.content_length else 0)
+            if length > MAX_CONTENT_LENGTH:
+                return False
+        return self.embeds + len(hook.embeds) <= MAX_EMBEDS and self.length + hook.length <= MAX_EMBEDS_LENGTH
+
+    def add(self, hook: Hook, future: Future):
+        if hook.content:
+            self.content_length += len(hook.content) + (1 if self.content_length else 0)
+        self.embeds += len(hook.embeds)
+        self.length += hook.length
+        self.hooks.append(hook)
+        self.futures.append(future)
+
+
+class Batcher:
+    """Merges hooks sent close together into fewer webhook messages
+
+    Hooks added to the batcher wait up to `window` seconds, and then all the hooks that wait for the
+    same url with the same identity (username, avatar_url and tts) are sent as one message.
+    Their contents are joined with newlines up to 2000 characters, and their embeds are packed
+    up to 10 embeds and 6000 characters per message. When a hook doesn't fit, the batch is sent right away and a new
+    one is started. Hooks with a file are sent on their own. A hook whose future is cancelled before
+    its message is sent is left out of the message.
+
+    The merged messages are sent from the batcher's thread, or submitted to a Dispatcher when one is given.
+
+    Attributes:
+        window (float): The maximum number of seconds a hook waits for others to be merged with.
+        transport (Transport): The transport the messages are sent with, when there is no dispatcher.
+        dispatcher (Dispatcher): The dispatcher the messages are submitted to.
+    """
+
+    def __init__(self, window: float = 1.0, transport: Transport = None, dispatcher: Dispatcher = None):
+        """Initiate the Batcher object and start its thread
+
+        Args:
+            window (float): The maximum number of seconds a hook waits for others to be merged with.
+            transport (Transport): The transport the messages are sent with, when there is no dispatcher.
+            dispatcher (Dispatcher): The dispatcher the messages are submitted to.
+        """
+        if window < 0:
+            raise ValueError('window must be non negative')
+        if transport is not None and not isinstance(transport, Transport):
+            raise TypeError('transport must be Transport')
+        if dispatcher is not None and not isinstance(dispatcher, Dispatcher):
+            raise TypeError('dispatcher must be Dispatcher')
+
+        self.window = window
+        self.transport = transport
+        self.dispatcher = dispatcher
+
+        self._batches = {}
+        self._closed = False
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+        self._thread = threading.Thread(target=self._work, name='DiscordHooks-batcher', daemon=True)
+        self._thread.start()
+
+    def add(self, hook: Hook, hook_url: str = None) -> Future:
+        """Add a hook to be merged and sent
+
+        Args:
+            hook (Hook): The hook to send.
+            hook_url (str): The url which the data will be sent to. The hook's url when not set.
+
+        Returns:
+            Future: Resolved with the response of the server once the message the hook was merged into is sent.
+        """
+        if not isinstance(hook, Hook):
+            raise TypeError('hook must be Hook')
+        hook_url = hook_url or hook.hook_url
+        if not hook_url:
+            raise AttributeError('hook_url is not set')
+        if not (hook.content or hook.attachments or hook.embeds):
+            raise AttributeError('You cant post an empty payload.')
+
+        future = Future()
+        if hook.attachments:
+            future.set_running_or_notify_cancel()
+            self._send(hook, hook_url, [future])
+            return future
+
+        key = (hook_url, hook.username, hook.avatar_url, hook.tts)
+        full = None
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('the batcher is closed')
+
+            batch = self._batches.get(key)
+            if batch is not None and not batch.fits(hook):
+                full = self._batches.pop(key)
+                batch = None
+            if batch is None:
+                batch = self._batches[key] = _Batch(time.monotonic() + self.window)
+                self._changed.notify()
+            batch.add(hook, future)
+
+        if full is not None:
+            self._send_batch(key, full)
+        return future
+
+    def flush(self):
+        """Send all the waiting hooks now, without waiting for their window to pass"""
+        with self._lock:
+            batches, self._batches = self._batches, {}
+        for key, batch in batches.items():
+            self._send_batch(key, batch)
+
+    def close(self):
+        """Send all the waiting hooks and stop the batcher's thread"""
+        with self._lock:
+            self._closed = True
+            self._changed.notify()
+        self.flush()
+        self._thread.join()
+
+    def __enter__(self) -> 'Batcher':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _work(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                due = [key for key, batch in self._batches.items() if batch.deadline <= now]
+                if not due:
+                    if self._closed:
+                        return
+                    deadline = min((batch.deadline for batch in self._batches.values()), default=None)
+                    self._changed.wait(None if deadline is None else deadline - now)
+                    continue
+                batches = [(key, self._batches.pop(key)) for key in due]
+
+            for key, batch in batches:
+                self._send_batch(key, batch)
+
+    def _send_batch(self, key: tuple, batch: _Batch):
+        # the hooks whose future was cancelled while they waited are not sent,
+        # and the others can't be cancelled anymore, so their futures can always be resolved
+        hooks, futures = [], []
+        for hook, future in zip(batch.hooks, batch.futures):
+            if future.set_running_or_notify_cancel():
+                hooks.append(hook)
+                futures.append(future)
+        if not hooks:
+            return
+
+        hook_url, username, avatar_url, tts = key
+        try:
+            hook = Hook(content='\n'.join(hook.content for hook in hooks if hook.content) or None,
+                        username=username, avatar_url=avatar_url, tts=tts,
+                        embeds=[embed for hook in hooks for embed in hook.embeds])
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+        else:
+            self._send(hook, hook_url, futures)
+
+    def _send(self, hook: Hook, hook_url: str, futures: [Future]):
+        sent = Future()
+        try:
+            if self.dispatcher is not None:
+                sent = self.dispatcher.submit(hook, hook_url)
+            else:
+                sent.set_result(hook.execute(hook_url, transport=self.transport))
+        except Exception as e:
+            sent.set_exception(e)
+        sent.add_done_callback(lambda done: _copy_result(done, futures))
+
+
+def _copy_result(sent: Future, futures: [Future]):
+    exception = sent.exception()
+    for future in futures:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(sent.result())
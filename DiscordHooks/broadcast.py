@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+
+from .hook import Hook
+from .transport import Transport, default_transport
+
+
+def broadcast(hook: Hook, urls: [str], concurrency: int = 10, json_obj: str = None,
+              transport: Transport = None) -> dict:
+    """Send one message to many webhooks at once
+
+    The hook is serialized once, and the payload is sent to up to `concurrency` urls at a time
+    over the transport's pooled connections, paced by its rate limiter.
+
+    Note:
+        Attached files are read again for every url, and by several urls at once, so they must be replayable
+            (bytes, paths or seekable file objects); other attachments raise ValueError.
+        To keep a connection per concurrent send, use a transport with pool_maxsize of at least concurrency.
+
+    Args:
+        hook (Hook): The hook to send.
+        urls ([str]): The urls to send the hook to.
+        concurrency (int): The maximum number of sends in flight at once.
+        json_obj (str): The json string (or its utf-8 bytes) that will be sent, instead of the hook's json.
+        transport (Transport): The transport to send with. The hook's transport when not set.
+
+    Returns:
+        dict: The result of every url: the response of the server, or the exception the send failed with.
+    """
+    if not isinstance(hook, Hook):
+        raise TypeError('hook must be Hook')
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise ValueError('concurrency must be a positive int')
+    _check_replayable(hook)
+
+    payload, headers = hook._body(json_obj)
+    if transport is None:
+        transport = hook.transport or default_transport()
+
+    def send(url: str):
+        try:
+            result = transport.post(url, data=payload, headers=headers)
+        except Exception as e:
+            return e
+        Hook._log_result(result)
+        return result
+
+    urls = list(dict.fromkeys(urls))
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(urls) or 1)) as executor:
+        return dict(zip(urls, executor.map(send, urls)))
+
+
+async def broadcast_async(hook: Hook, urls: [str], concurrency: int = 100, json_obj: str = None,
+                          transport: 'AsyncTransport' = None) -> dict:
+    """Send one message to many webhooks at once, without blocking the event loop
+
+    The hook is serialized once, and the payload is sent to up to `concurrency` urls at a time
+    over the transport's pooled connections, paced by its rate limiter.
+
+    Note:
+        Attached files must be replayable, as in broadcast.
+
+    Args:
+        hook (Hook): The hook to send.
+        urls ([str]): The urls to send the hook to.
+        concurrency (int): The maximum number of sends in flight at once.
+        json_obj (str): The json string (or its utf-8 bytes) that will be sent, instead of the hook's json.
+        transport (AsyncTransport): The transport to send with. The running loop's default transport when not set.
+
+    Returns:
+        dict: The result of every url: the response of the server, or the exception the send failed with.
+    """
+    if not isinstance(hook, Hook):
+        raise TypeError('hook must be Hook')
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise ValueError('concurrency must be a positive int')
+    _check_replayable(hook)
+
+    import asyncio
+
+    payload, headers = hook._body(json_obj)
+    if transport is None:
+        from .async_transport import default_async_transport
+        transport = default_async_transport()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(url: str):
+        async with semaphore:
+            try:
+                result = await transport.post(url, data=payload, headers=headers)
+            except Exception as e:
+                return e
+        Hook._log_result(result)
+        return result
+
+    urls = list(dict.fromkeys(urls))
+    return dict(zip(urls, await asyncio.gather(*(send(url) for url in urls))))
+
+
+def _check_replayable(hook: Hook):
+    # an iterator or a file that can't seek would be read by the first url only, or split between the urls
+    if not all(attachment.replayable for attachment in hook.attachments):
+        raise ValueError('broadcast attachments must be replayable (bytes, paths or seekable file objects)')
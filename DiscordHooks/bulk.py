@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+
+from .embed import Embed, MAX_FIELD_NAME_LENGTH, MAX_FIELD_VALUE_LENGTH
+from .hook import Hook
+from .serializer import dumps, encoder_for
+from .splitter import MAX_CONTENT_LENGTH, MAX_EMBEDS, MAX_EMBEDS_LENGTH, MAX_FIELDS
+from .template import EmbedTemplate
+
+# the maximum length of each text item of an embed
+_TEXT_LIMITS = {'title': 256, 'description': 2048, 'url': None}
+
+
+def records_from_columns(columns: dict):
+    """Iterate over the rows of columnar data
+
+    Args:
+        columns (dict): The values of every column, by its name. The columns are iterated in step,
+            so they may be lists, arrays or generators.
+
+    Yields:
+        dict: The values of the next row, by the column names.
+    """
+    names = list(columns)
+    for values in zip(*(columns[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+class BulkBuilder:
+    """Builder of serialized webhook payloads from a stream of records
+
+    The layout tells where every item of the embed comes from: a key of the record, or a function that
+    takes the record. The records are read in batches of `batch_size`; each item is checked for the whole
+    batch at once, and the payloads are encoded straight to json, without creating Embed or EmbedField
+    objects. The invariant parts of the messages (the template embed, username, avatar_url, tts)
+    are validated and encoded once. Payloads are yielded as they are built, so a stream of any length is
+    built in constant memory.
+
+    Every record becomes one embed, and up to `embeds_per_message` consecutive embeds (as long as they
+    fit Discord's 6000 characters limit) are sent in one message.
+
+    Example:
+        builder = BulkBuilder(description='message', fields=[('Host', 'host'), ('CPU', lambda row: row['cpu'])],
+                              template=Embed(title='Metrics', color=Color.Blue), username='monitor')
+        for payload in builder.payloads(rows):
+            dispatcher.submit(hook, json_obj=payload, priority=Dispatcher.LOW)
+
+    Attributes:
+        layout (dict): The source of every item of the embed (title, description, url, color, timestamp).
+        fields ([(str, object)]): The name and the source of the value of every field.
+        content: The source of the content of the message (the contents of a message's records are joined
+            with a newline). None for no content.
+        embeds_per_message (int): The maximum number of records in one message.
+        batch_size (int): The number of records validated together.
+    """
+
+    def __init__(self, title=None, description=None, url=None, color=None, timestamp=None, fields: list = None,
+                 content=None, template=None, embeds_per_message: int = 1, batch_size: int = 1000,
+                 username: str = None, avatar_url: str = None, tts: bool = False):
+        """Initiate the BulkBuilder object
+
+        Args:
+            title: The source of the title: a key of the records, or a function of a record.
+            description: The source of the description.
+            url: The source of the url.
+            color: The source of the color.
+            timestamp: The source of the timestamp.
+            fields (list): (name, source) pairs of the fields. A field whose value is None or empty is left out.
+            content: The source of the content of the message.
+            template (Embed): The invariant items of the embeds (an Embed or an EmbedTemplate).
+                Its fields come before the fields of the layout.
+            embeds_per_message (int): The maximum number of records in one message (up to 10).
+            batch_size (int): The number of records validated together.
+            username (str): Overrides the default username of the webhook.
+            avatar_url (str): Overrides the default avatar of the webhook.
+            tts (bool): True if the messages are Text-To-Speech messages.
+        """
+        if not isinstance(embeds_per_message, int) or not 1 <= embeds_per_message <= MAX_EMBEDS:
+            raise ValueError('embeds_per_message must be between 1 and {}'.format(MAX_EMBEDS))
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError('batch_size must be a positive int')
+        if isinstance(template, EmbedTemplate):
+            template = template._embed
+        if template is not None and not isinstance(template, Embed):
+            raise TypeError('template must be Embed or EmbedTemplate')
+
+        fields = list(fields or [])
+        for name, _ in fields:
+            if not isinstance(name, str):
+                raise TypeError('fields names must be string')
+            if len(name) > MAX_FIELD_NAME_LENGTH:
+                raise ValueError('name length must be up to {} characters'.format(MAX_FIELD_NAME_LENGTH))
+        template_fields = len(template.fields) if template is not None else 0
+        if template_fields + len(fields) > MAX_FIELDS:
+            raise ValueError('embed can contain up to {} field objects'.format(MAX_FIELDS))
+
+        self.layout = {key: source for key, source in (('title', title), ('description', description), ('url', url),
+                                                       ('color', color), ('timestamp', timestamp))
+                       if source is not None}
+        self.fields = fields
+        self.content = content
+        self.embeds_per_message = embeds_per_message
+        self.batch_size = batch_size
+
+        self._getters = {key: _getter(source) for key, source in self.layout.items()}
+        self._field_getters = [(name, _getter(source)) for name, source in fields]
+        self._content_getter = _getter(content) if content is not None else None
+
+        # the invariant parts, validated by the models and encoded once
+        self._embed = dict(template._encoded()) if template is not None else {}
+        self._embed_length = 0
+        if template is not None:
+            # the items the layout overrides don't count
+            self._embed_length = template.length - sum(len(getattr(template, key) or '')
+                                                       for key in ('title', 'description') if key in self.layout)
+        self._message = encoder_for(Hook)(Hook(username=username, avatar_url=avatar_url, tts=tts))
+        self._message.pop('embeds', None)
+        self._message.pop('content', None)
+
+    def payloads(self, records) -> iter:
+        """Build the payloads of a stream of records
+
+        Args:
+            records: An iterable (or generator) of records: dicts, or whatever the layout's functions take.
+
+        Yields:
+            str: The json payload of the next message, ready for Hook.execute(json_obj=...).
+
+        Raises:
+            ValueError: If an item of a record is too long; the message tells the index of the record.
+            TypeError: If an item of a record is of the wrong type.
+        """
+        records = iter(records)
+        index = 0
+        embeds, contents, length, content_length = [], [], 0, -1
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            for embed, content, size in zip(*self._build_batch(batch, index)):
+                content_size = len(content) + 1 if content else 0
+                if embeds and (len(embeds) >= self.embeds_per_message or length + size > MAX_EMBEDS_LENGTH
+                               or content_length + content_size > MAX_CONTENT_LENGTH):
+                    yield self._dump(embeds, contents)
+                    embeds, contents, length, content_length = [], [], 0, -1
+                embeds.append(embed)
+                length += size
+                if content:
+                    contents.append(content)
+                    content_length += content_size
+            index += len(batch)
+        if embeds:
+            yield self._dump(embeds, contents)
+
+    def columns(self, columns: dict) -> iter:
+        """Build the payloads of columnar data
+
+        Args:
+            columns (dict): The values of every column, by its name (see records_from_columns).
+
+        Yields:
+            str: The json payload of the next message.
+        """
+        return self.payloads(records_from_columns(columns))
+
+    def _build_batch(self, batch: list, start: int) -> ([dict], [str], [int]):
+        count = len(batch)
+        embeds = [dict(self._embed) for _ in range(count)]
+        lengths = [self._embed_length] * count
+
+        for key, get in self._getters.items():
+            values = _column(get, batch, start, key)
+            limit = _TEXT_LIMITS.get(key, 0)
+            if limit == 0:
+                kind = int if key == 'color' else datetime
+                for i, value in enumerate(values):
+                    if value is None:
+                        continue
+                    if not isinstance(value, kind) or isinstance(value, bool):
+                        raise TypeError('record {}: {} must be {}'.format(start + i, key, kind.__name__))
+                    embeds[i][key] = value if kind is int else value.isoformat()
+                continue
+            for i, value in enumerate(values):
+                if value is None:
+                    continue
+                if not isinstance(value, str):
+                    value = str(value)
+                if limit is not None:
+                    if len(value) > limit:
+                        raise ValueError('record {}: {} length must be up to {} characters'
+                                         .format(start + i, key, limit))
+                    lengths[i] += len(value)
+                embeds[i][key] = value
+
+        if self._field_getters:
+            fields = [list(embed.get('fields', ())) for embed in embeds]
+            for name, get in self._field_getters:
+                values = _column(get, batch, start, name)
+                for i, value in enumerate(values):
+                    if value is None:
+                        continue
+                    if not isinstance(value, str):
+                        value = str(value)
+                    if not value:
+                        continue
+                    if len(value) > MAX_FIELD_VALUE_LENGTH:
+                        raise ValueError('record {}: value of {} length must be up to {} characters'
+                                         .format(start + i, name, MAX_FIELD_VALUE_LENGTH))
+                    fields[i].append({'name': name, 'value': value})
+                    lengths[i] += len(name) + len(value)
+            for embed, embed_fields in zip(embeds, fields):
+                embed['fields'] = embed_fields
+
+        contents = [None] * count
+        if self._content_getter is not None:
+            for i, value in enumerate(_column(self._content_getter, batch, start, 'content')):
+                if value is None:
+                    continue
+                if not isinstance(value, str):
+                    value = str(value)
+                if len(value) > MAX_CONTENT_LENGTH:
+                    raise ValueError('record {}: content length must be up to {} characters'
+                                     .format(start + i, MAX_CONTENT_LENGTH))
+                contents[i] = value
+
+        for i, length in enumerate(lengths):
+            if length > MAX_EMBEDS_LENGTH:
+                raise ValueError('record {}: embed length must be up to {} characters'
+                                 .format(start + i, MAX_EMBEDS_LENGTH))
+        return embeds, contents, lengths
+
+    def _dump(self, embeds: [dict], contents: [str]) -> str:
+        message = dict(self._message)
+        if contents:
+            message['content'] = '\n'.join(contents)
+        message['embeds'] = embeds
+        return dumps(message)
+
+
+def _getter(source) -> callable:
+    if callable(source):
+        return source
+    return itemgetter(source)
+
+
+def _column(get: callable, batch: list, start: int, name: str) -> list:
+    try:
+        return [get(record) for record in batch]
+    except (KeyError, IndexError, TypeError) as e:
+        # find the record that failed, for the error message
+        for i, record in enumerate(batch):
+            try:
+                get(record)
+            except (KeyError, IndexError, TypeError):
+                raise ValueError('record {}: no value for {}: {!r}'.format(start + i, name, e)) from e
+        raise
+
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from .dispatcher import Dispatcher
+from .hook import Hook
+from .serializer import dumps
+from .splitter import MAX_CONTENT_LENGTH
+from .transport import Transport, default_transport
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """A payload that was sent, and the duplicates of it that were suppressed since"""
+    __slots__ = ('expires', 'url', 'json_obj', 'count')
+
+    def __init__(self, expires: float, url: str, json_obj: str):
+        self.expires = expires
+        self.url = url
+        self.json_obj = json_obj
+        self.count = 0
+
+
+class Deduplicator:
+    """Suppression of repeated messages
+
+    The first time a payload is sent it goes out as usual, and it opens a window of `window` seconds
+    in which the same payload (sent to the same url) is suppressed. When the window ends, if there
+    were duplicates, one summary message is sent: the original message with the summary line appended
+    to its content (in SUMMARIZE mode; in DROP mode the duplicates are just dropped).
+
+    Payloads are identified by a 128-bit hash of their key, which is the serialized Hook.json unless
+    a key function is given (e.g. to ignore a timestamp that changes on every alert). Lookups are O(1),
+    and at most `maxsize` payloads are tracked: when the cache is full the oldest window ends early.
+
+    Summaries are sent when windows end during a later send, by `flush`, or by the background thread
+    of `start`.
+
+    Attributes:
+        window (float): The number of seconds duplicates of a sent payload are suppressed.
+        maxsize (int): The maximum number of payloads tracked at once.
+        key (callable): Takes a Hook and returns the str or bytes that identify it. None for its json.
+        mode (str): SUMMARIZE to send a summary of the suppressed duplicates, DROP to drop them silently.
+        summary (str): The line appended to the summary message, formatted with count and window.
+        transport (Transport): The transport messages are sent with. The shared default transport when not set.
+        dispatcher (Dispatcher): Messages are submitted to the dispatcher instead of sent right away, when set.
+    """
+    SUMMARIZE = 'summarize'
+    DROP = 'drop'
+
+    def __init__(self, window: float = 60.0, maxsize: int = 10000, key: callable = None, mode: str = SUMMARIZE,
+                 summary: str = '(repeated {count} more times in {window:g}s)', transport: Transport = None,
+                 dispatcher: Dispatcher = None):
+        """Initiate the Deduplicator object
+
+        Args:
+            window (float): The number of seconds duplicates of a sent payload are suppressed.
+            maxsize (int): The maximum number of payloads tracked at once.
+            key (callable): Takes a Hook and returns the str or bytes that identify it. None for its json.
+            mode (str): SUMMARIZE or DROP.
+            summary (str): The line appended to the summary message, formatted with count and window.
+            transport (Transport): The transport messages are sent with.
+            dispatcher (Dispatcher): The dispatcher messages are submitted to, instead of sending them right away.
+        """
+        if window <= 0:
+            raise ValueError('window must be positive')
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError('maxsize must be a positive int')
+        if key is not None and not callable(key):
+            raise TypeError('key must be callable')
+        if mode not in (self.SUMMARIZE, self.DROP):
+            raise ValueError('mode must be one of SUMMARIZE, DROP')
+        if transport is not None and not isinstance(transport, Transport):
+            raise TypeError('transport must be Transport')
+        if dispatcher is not None and not isinstance(dispatcher, Dispatcher):
+            raise TypeError('dispatcher must be Dispatcher')
+
+        self.window = window
+        self.maxsize = maxsize
+        self.key = key
+        self.mode = mode
+        self.summary = summary
+        self.transport = transport
+        self.dispatcher = dispatcher
+
+        # ordered by the time the windows end, which is the order they were opened
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._suppressed = 0
+        self._summaries = 0
+
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __len__(self) -> int:
+        """int: The number of payloads tracked"""
+        return len(self._entries)
+
+    @property
+    def suppressed(self) -> int:
+        """int: The number of duplicates that were suppressed."""
+        return self._suppressed
+
+    @property
+    def summaries(self) -> int:
+        """int: The number of summary messages that were sent."""
+        return self._summaries
+
+    def check(self, hook: Hook, hook_url: str = None) -> bool:
+        """Check a hook that is about to be sent, and track it
+
+        Args:
+            hook (Hook): The hook.
+            hook_url (str): The url the hook is sent to. The hook's url when not set.
+
+        Returns:
+            bool: True if the hook should be sent, False if it is a duplicate and was counted instead.
+        """
+        hook_url = hook_url or hook.hook_url
+        json_obj = hook.json
+        key = json_obj if self.key is None else self.key(hook)
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        digest = hashlib.blake2b(hook_url.encode('utf-8') + b'\0' + key, digest_size=16).digest()
+
+        now = time.monotonic()
+        with self._lock:
+            ended = self._expire(now)
+            entry = self._entries.get(digest)
+            if entry is not None:
+                entry.count += 1
+                self._suppressed += 1
+                duplicate = True
+            else:
+                if len(self._entries) >= self.maxsize:
+                    ended.append(self._entries.popitem(last=False)[1])
+                self._entries[digest] = _Entry(now + self.window, hook_url,
+                                               json_obj if self.mode == self.SUMMARIZE else None)
+                duplicate = False
+
+        self._summarize(ended)
+        return not duplicate
+
+    def execute(self, hook: Hook, hook_url: str = None):
+        """Send a hook unless it is a duplicate of a hook sent in the window
+
+        Args:
+            hook (Hook): The hook to send.
+            hook_url (str): The url the hook is sent to. The hook's url when not set.
+
+        Returns:
+            The response of the server (a Future of it with a dispatcher), None if the hook was suppressed.
+        """
+        if not isinstance(hook, Hook):
+            raise TypeError('hook must be Hook')
+        if not (hook_url or hook.hook_url):
+            raise AttributeError('hook_url is not set')
+        if not self.check(hook, hook_url):
+            return None
+        return self._send(hook, hook_url or hook.hook_url, None)
+
+    def flush(self, force: bool = False) -> int:
+        """Send the summaries of the windows that ended
+
+        Args:
+            force (bool): True to end all the windows now.
+
+        Returns:
+            int: The number of summaries that were sent.
+        """
+        with self._lock:
+            if force:
+                ended = list(self._entries.values())
+                self._entries.clear()
+            else:
+                ended = self._expire(time.monotonic())
+        return self._summarize(ended)
+
+    def start(self, interval: float = 1.0):
+        """Send the summaries of windows that ended in a background thread
+
+        Args:
+            interval (float): The number of seconds between checks for windows that ended.
+        """
+        if self._thread is not None:
+            raise RuntimeError('the deduplicator is already started')
+        self._thread = threading.Thread(target=self._work, args=(interval,), name='DiscordHooks-dedup', daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = None):
+        """Stop the background thread, and send the summaries of all the open windows
+
+        Args:
+            timeout (float): The maximum number of seconds to wait for the background thread.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush(force=True)
+
+    def __enter__(self) -> 'Deduplicator':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _work(self, interval: float):
+        while not self._stopped.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Error while sending the summaries of repeated messages')
+
+    def _expire(self, now: float) -> [_Entry]:
+        ended = []
+        entries = self._entries
+        while entries:
+            entry = next(iter(entries.values()))
+            if entry.expires > now:
+                break
+            ended.append(entries.popitem(last=False)[1])
+        return ended
+
+    def _summarize(self, ended: [_Entry]) -> int:
+        sent = 0
+        for entry in ended:
+            if not entry.count or self.mode != self.SUMMARIZE:
+                continue
+            payload = json.loads(entry.json_obj)
+            line = self.summary.format(count=entry.count, window=self.window)
+            content = payload.get('content') or ''
+            room = MAX_CONTENT_LENGTH - len(line) - 1
+            if len(content) > room:
+                content = content[:max(0, room - 1)] + '…'
+            payload['content'] = '{}\n{}'.format(content, line) if content else line
+            try:
+                self._send(Hook(), entry.url, dumps(payload))
+            except Exception:
+                logger.exception('Error while sending the summary of a repeated message')
+                continue
+            sent += 1
+        with self._lock:
+            self._summaries += sent
+        return sent
+
+    def _send(self, hook: Hook, hook_url: str, json_obj: str):
+        if self.dispatcher is not None:
+            return self.dispatcher.submit(hook, hook_url, json_obj)
+        return hook.execute(hook_url, json_obj, self.transport or hook.transport or default_transport())
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from .hook import Hook
+from .metrics import SendEvent
+from .transport import Transport, default_transport
+
+
+class _Lane:
+    """The hooks of one priority waiting to be sent, by the rate limit bucket they are sent to"""
+    __slots__ = ('priority', 'rank', 'weight', 'buckets', 'size', 'pass_')
+
+    def __init__(self, priority: str, rank: int, weight: float):
+        self.priority = priority
+        # 0 for the highest priority
+        self.rank = rank
+        self.weight = weight
+        # bucket key -> deque of the jobs, in the order they were submitted
+        self.buckets = OrderedDict()
+        self.size = 0
+        # the virtual time of the lane's next send (stride scheduling)
+        self.pass_ = 0.0
+
+
+class Dispatcher:
+    """Background sender of hooks
+
+    Hooks submitted to the dispatcher wait in a bounded in-memory queue,
+    and are sent by a pool of worker threads, so the caller doesn't wait for Discord to answer.
+
+    Every hook is submitted with a priority, and waits in the lane of its priority. The workers take
+    the hooks from the lanes by their weights (stride scheduling): while the lanes are busy, every lane
+    gets a share of the sends proportional to its weight, so a critical hook goes out next while
+    bulk hooks still get their share and never starve. A lane that was empty starts from the current
+    turn, so it can't save up sends while idle.
+
+    Inside a lane the hooks of every rate limit bucket are sent in order: a bucket has at most one hook
+    being sent at a time, and a hook is only taken when its bucket can send right away. Hooks that wait
+    for their bucket stay queued (other buckets are served meanwhile), instead of holding the bucket's
+    future slots, so a hook of a higher priority, or one sent with Hook.execute directly, gets the next
+    free slot of the bucket however many hooks are queued.
+
+    When the queue is full, submit acts according to the overflow policy:
+        Dispatcher.BLOCK: wait until there is room in the queue.
+        Dispatcher.DROP_OLDEST: drop the hook that waits the longest in the lowest priority lane to make room,
+            or the submitted hook if all the queued hooks have a higher priority.
+        Dispatcher.DROP_NEWEST: drop the submitted hook.
+    The future of a dropped hook fails with queue.Full.
+
+    Attributes:
+        transport (Transport): The transport the hooks are sent with. Each hook's own transport when not set.
+        workers (int): The number of worker threads.
+        maxsize (int): The maximum number of hooks waiting in the queue, in all the lanes together.
+        overflow (str): What to do when the queue is full (BLOCK, DROP_OLDEST or DROP_NEWEST).
+        lanes (dict): The weight of every priority, from the highest priority to the lowest.
+    """
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop_oldest'
+    DROP_NEWEST = 'drop_newest'
+
+    CRITICAL = 'critical'
+    HIGH = 'high'
+    NORMAL = 'normal'
+    LOW = 'low'
+    DEFAULT_LANES = {CRITICAL: 16, HIGH: 8, NORMAL: 4, LOW: 1}
+
+    def __init__(self, transport: Transport = None, workers: int = 4, maxsize: int = 1000, overflow: str = BLOCK,
+                 lanes: dict = None):
+        """Initiate the Dispatcher object and start its workers
+
+        Args:
+            transport (Transport): The transport the hooks are sent with. Each hook's own transport when not set.
+            workers (int): The number of worker threads.
+            maxsize (int): The maximum number of hooks waiting in the queue.
+            overflow (str): What to do when the queue is full (BLOCK, DROP_OLDEST or DROP_NEWEST).
+            lanes (dict): The weight of every priority, from the highest priority to the lowest.
+                DEFAULT_LANES (CRITICAL, HIGH, NORMAL and LOW) when not set. Must have a NORMAL lane.
+        """
+        if transport is not None and not isinstance(transport, Transport):
+            raise TypeError('transport must be Transport')
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError('workers must be a positive int')
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError('maxsize must be a positive int')
+        if overflow not in (self.BLOCK, self.DROP_OLDEST, self.DROP_NEWEST):
+            raise ValueError('overflow must be one of BLOCK, DROP_OLDEST, DROP_NEWEST')
+        lanes = dict(lanes if lanes is not None else self.DEFAULT_LANES)
+        if not isinstance(lanes.get(self.NORMAL), (int, float)):
+            raise ValueError('lanes must have a NORMAL lane')
+        if not all(isinstance(weight, (int, float)) and weight > 0 for weight in lanes.values()):
+            raise ValueError('lanes weights must be positive numbers')
+
+        self.transport = transport
+        self.workers = workers
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.lanes = lanes
+
+        self._lanes = {priority: _Lane(priority, rank, weight) for rank, (priority, weight) in enumerate(lanes.items())}
+        self._size = 0
+        # the pass of the lane that sent last, where lanes that were empty start from
+        self._virtual_time = 0.0
+        # the buckets (and transports) that have a hook being sent, which are not served until it is done
+        self._busy = set()
+        self._unfinished = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._all_done = threading.Condition(self._lock)
+
+        self._threads = [threading.Thread(target=self._work, name='DiscordHooks-dispatcher-{}'.format(i),
+                                          daemon=True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, hook: Hook, hook_url: str = None, json_obj: str = None, timeout: float = None,
+               priority: str = NORMAL) -> Future:
+        """Queue a hook to be sent by the workers
+
+        Args:
+            hook (Hook): The hook to send.
+            hook_url (str): The url which the data will be sent to, as in Hook.execute.
+            json_obj (str): The json string (or its utf-8 bytes) that will be sent, as in Hook.execute.
+            timeout (float): The maximum number of seconds to wait for room in the queue with the BLOCK policy.
+            priority (str): The lane of the hook (CRITICAL, HIGH, NORMAL, LOW, or one of the dispatcher's lanes).
+
+        Returns:
+            Future: Resolved with the response of the server once the hook is sent.
+
+        Raises:
+            queue.Full: If the queue is still full after timeout with the BLOCK policy.
+        """
+        if not isinstance(hook, Hook):
+            raise TypeError('hook must be Hook')
+        lane = self._lanes.get(priority)
+        if lane is None:
+            raise ValueError('priority must be one of {}'.format(', '.join(self._lanes)))
+
+        transport = self.transport or hook.transport or default_transport()
+        url = hook_url or hook.hook_url
+        # the hooks without a url fail when they are sent, as in Hook.execute
+        key = transport.rate_limiter.bucket_key(url) if url else None
+
+        future = Future()
+        dropped = None
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('the dispatcher is closed')
+
+            if self._size >= self.maxsize:
+                if self.overflow == self.DROP_NEWEST:
+                    dropped = future
+                elif self.overflow == self.DROP_OLDEST:
+                    dropped = self._drop_oldest(lane) or future
+                elif not self._not_full.wait_for(lambda: self._size < self.maxsize or self._closed, timeout):
+                    raise queue.Full('the dispatcher queue is full')
+                elif self._closed:
+                    raise RuntimeError('the dispatcher is closed')
+
+            if dropped is not future:
+                if not lane.size:
+                    lane.pass_ = max(lane.pass_, self._virtual_time)
+                jobs = lane.buckets.get(key)
+                if jobs is None:
+                    jobs = lane.buckets[key] = deque()
+                jobs.append((future, hook, hook_url, json_obj, time.perf_counter(), transport, url))
+                lane.size += 1
+                self._size += 1
+                self._unfinished += 1
+                self._not_empty.notify()
+
+        # resolved outside the lock, so callbacks of the future may submit again
+        if dropped is not None:
+            dropped.set_exception(queue.Full('the dispatcher queue is full, the hook was dropped'))
+        return future
+
+    def queued(self) -> dict:
+        """Get the number of hooks waiting in every lane
+
+        Returns:
+            dict: The number of hooks waiting to be sent, by priority.
+        """
+        with self._lock:
+            return {priority: lane.size for priority, lane in self._lanes.items()}
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until all the queued hooks are sent
+
+        Args:
+            timeout (float): The maximum number of seconds to wait. None to wait until done.
+
+        Returns:
+            bool: True if all the hooks were sent, False if the timeout passed first.
+        """
+        with self._lock:
+            return self._all_done.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def close(self, timeout: float = None) -> bool:
+        """Stop accepting hooks, send the queued hooks and stop the workers
+
+        Args:
+            timeout (float): The maximum number of seconds to wait for the queued hooks. None to wait until done.
+
+        Returns:
+            bool: True if all the hooks were sent, False if the timeout passed first.
+                Hooks that were not sent yet stay queued, and are sent by the workers in the background.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+        done = self.flush(timeout)
+        for thread in self._threads:
+            if deadline is None:
+                thread.join()
+            else:
+                thread.join(max(0.0, deadline - time.monotonic()))
+        return done
+
+    def __enter__(self) -> 'Dispatcher':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _work(self):
+        while True:
+            with self._lock:
+                while True:
+                    job, delay = self._next()
+                    if job is not None or (self._closed and not self._size):
+                        break
+                    # woken up by a submit, or when the soonest bucket is free
+                    self._not_empty.wait(delay)
+                if job is None:
+                    return
+                self._not_full.notify()
+
+            future, hook, hook_url, json_obj, queued, transport, _, priority, bucket = job
+            try:
+                if future.set_running_or_notify_cancel():
+                    event = SendEvent(queue_wait=time.perf_counter() - queued, priority=priority)
+                    try:
+                        future.set_result(hook.execute(hook_url, json_obj, transport, event))
+                    except Exception as e:
+                        future.set_exception(e)
+            finally:
+                with self._lock:
+                    if bucket is not None:
+                        self._busy.discard(bucket)
+                    self._task_done()
+                    # workers may wait for a busy bucket with hooks still queued: once the closed queue
+                    # is empty they all stop, otherwise one can take the next hook of the bucket
+                    if self._closed and not self._size:
+                        self._not_empty.notify_all()
+                    elif bucket is not None:
+                        self._not_empty.notify()
+
+    def _next(self) -> (tuple, float):
+        """Take the next hook to send, from the lanes by their weights, whose bucket can send right away
+
+        Returns:
+            (tuple, float): The job of the hook, and None; or None, and the number of seconds until
+                the soonest bucket is free (None if the queue is empty, or all its buckets are busy).
+        """
+        soonest = None
+        delays = {}
+        for lane in sorted((lane for lane in self._lanes.values() if lane.size),
+                           key=lambda lane: (lane.pass_, lane.rank)):
+            for key, jobs in lane.buckets.items():
+                transport = jobs[0][5]
+                if (key, transport) in self._busy:
+                    continue
+                delay = delays.get((key, transport))
+                if delay is None:
+                    delay = delays[key, transport] = transport.rate_limiter.delay(jobs[0][6]) if key else 0.0
+                if delay > 0:
+                    soonest = delay if soonest is None else min(soonest, delay)
+                    continue
+
+                job = jobs.popleft()
+                if jobs:
+                    # the next hook of the bucket waits behind the other buckets of the lane
+                    lane.buckets.move_to_end(key)
+                else:
+                    del lane.buckets[key]
+                lane.size -= 1
+                self._size -= 1
+                self._virtual_time = lane.pass_
+                lane.pass_ += 1 / lane.weight
+                bucket = None
+                if key:
+                    bucket = (key, transport)
+                    self._busy.add(bucket)
+                return job + (lane.priority, bucket), None
+        return None, soonest
+
+    def _drop_oldest(self, lane: _Lane) -> Future:
+        """Drop the hook that waits the longest in the lowest priority lane, if it is not above lane
+
+        Returns:
+            Future: The future of the dropped hook, None if all the queued hooks have a higher priority.
+        """
+        lowest = max((queued for queued in self._lanes.values() if queued.size), key=lambda queued: queued.rank)
+        if lowest.rank < lane.rank:
+            return None
+        key = min(lowest.buckets, key=lambda key: lowest.buckets[key][0][4])
+        jobs = lowest.buckets[key]
+        future = jobs.popleft()[0]
+        if not jobs:
+            del lowest.buckets[key]
+        lowest.size -= 1
+        self._size -= 1
+        self._task_done()
+        return future
+
+    def _task_done(self):
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._all_done.notify_all()
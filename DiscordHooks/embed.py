@@ -1,7 +1,71 @@
 # -*- coding: utf-8 -*-
 
+import re
 from datetime import datetime
 from abc import ABC, abstractmethod
+from itertools import count
+
+from .serializer import encoder_for
+
+# every change of a serializable object gets a unique version, so a state is never mistaken for another
+_versions = count()
+
+MAX_FIELDS = 25
+MAX_FIELD_NAME_LENGTH = 256
+MAX_FIELD_VALUE_LENGTH = 1024
+# the maximum number of characters of all the embeds of a message together
+MAX_EMBEDS_LENGTH = 6000
+
+# the characters json escapes: the short escapes take 2 bytes, the rest \u00XX (6 bytes)
+_ESCAPED = re.compile(r'[\x00-\x1f"\\]')
+_SHORT_ESCAPES = frozenset('\b\f\n\r\t"\\')
+
+
+def _json_size(value) -> int:
+    """Get the number of bytes of a scalar value in the compact utf-8 json of the serializer"""
+    if isinstance(value, str):
+        size = (len(value) if value.isascii() else len(value.encode('utf-8'))) + 2
+        if '"' in value or '\\' in value or not value.isprintable():
+            for char in _ESCAPED.findall(value):
+                size += 1 if char in _SHORT_ESCAPES else 5
+        return size
+    if isinstance(value, bool):
+        return 4 if value else 5
+    if isinstance(value, datetime):
+        return len(value.isoformat()) + 2
+    return len(str(value))
+
+
+def _measure(obj) -> (int, int, int):
+    """Measure the scalar items of a model
+
+    The measures are cached until one of the items is set (by the version of the object), so they are
+    computed once per change, and reading them again is O(1). Nested objects keep their own measures.
+
+    Returns:
+        (int, int, int): The json size of the scalar items with the braces (without the commas between them),
+            the number of them that are set, and the number of their characters that count toward
+            the 6000 characters of a message.
+    """
+    try:
+        version, size, items, length = obj._measures
+        if version == obj._version:
+            return size, items, length
+    except AttributeError:
+        pass
+
+    size, items, length = 2, 0, 0
+    counted = obj.__counted__
+    for key, attr in obj.__scalars__.items():
+        value = getattr(obj, attr)
+        if value is not None:
+            # "key":value
+            size += len(key) + 3 + _json_size(value)
+            items += 1
+            if key in counted:
+                length += len(value)
+    object.__setattr__(obj, '_measures', (obj._version, size, items, length))
+    return size, items, length
 
 
 class Color:
@@ -29,14 +93,105 @@ class Color:
 
 
 class BaseSerializable(ABC):
-    """Abstract class for serializable objects"""
+    """Abstract class for serializable objects
+
+    The encoded form of the object is cached, and the cache is invalidated
+    whenever one of the items is set, on the object or on an object nested in it.
+
+    The models use __slots__ instead of a per-instance __dict__, to keep many queued messages compact.
+
+    The json size of the object and its number of characters that count toward the 6000 characters
+    of a message are measured once per change, so `size` and `length` are known without serializing.
+    """
+    __slots__ = ('_version', '_encoded_cache', '_measures')
     __items__ = ()
+    # the attributes that hold nested serializable objects (or lists of them)
+    __nested__ = ()
+    # the items whose characters count toward the 6000 characters of a message
+    __counted__ = ()
+    # the items that are not nested objects, by the attributes that hold them; set by __init_subclass__
+    __scalars__ = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.__scalars__ = {key: '_' + key for key in cls.__items__ if '_' + key not in cls.__nested__}
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.__items__:
+            super().__setattr__('_version', next(_versions))
+
+    @property
+    def size(self) -> int:
+        """int: The number of bytes of the json of the object, from the measures of it and its nested objects.
+
+        Takes time proportional to the number of nested objects (up to 25 fields), without serializing anything.
+        """
+        size, items, _ = _measure(self)
+        for name in self.__nested__:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            # "name": without the underscore of the attribute
+            size += len(name) + 2
+            if isinstance(value, list):
+                size += 2 + sum(item.size for item in value) + max(0, len(value) - 1)
+            else:
+                size += value.size
+            items += 1
+        return size + max(0, items - 1)
+
+    @property
+    def length(self) -> int:
+        """int: The number of characters of the object that count toward the 6000 characters of a message."""
+        length = _measure(self)[2]
+        for name in self.__nested__:
+            value = getattr(self, name)
+            if isinstance(value, list):
+                length += sum(item.length for item in value)
+            elif value is not None:
+                length += value.length
+        return length
 
     @property
     def dict(self) -> dict:
         """dict: The dict for serialization"""
         return {key: getattr(self, key) for key in self.__items__ if getattr(self, key) is not None}
 
+    def _signature(self) -> tuple:
+        """tuple: The versions of the object and of every object nested in it"""
+        versions = []
+        self._collect_versions(versions)
+        return tuple(versions)
+
+    def _collect_versions(self, versions: list):
+        versions.append(self._version)
+        for name in self.__nested__:
+            value = getattr(self, name)
+            if isinstance(value, list):
+                for item in value:
+                    collect = getattr(item, '_collect_versions', None)
+                    if collect is not None:
+                        collect(versions)
+                    else:
+                        versions.append(id(item))
+            elif value is not None:
+                value._collect_versions(versions)
+
+    def _encoded(self) -> dict:
+        """dict: The object encoded to json types, cached until the object or a nested object changes"""
+        signature = self._signature()
+        try:
+            cached_signature, encoded = self._encoded_cache
+            if cached_signature == signature:
+                return encoded
+        except AttributeError:
+            pass
+
+        encoded = encoder_for(type(self))(self)
+        super().__setattr__('_encoded_cache', (signature, encoded))
+        return encoded
+
     @staticmethod
     @abstractmethod
     def from_dict(obj: dict) -> 'BaseSerializable':
@@ -59,7 +214,9 @@ class EmbedFooter(BaseSerializable):
         text (str): footer text
         icon_url (str): url of footer icon (only supports http(s) and attachments)
     """
+    __slots__ = ('_text', '_icon_url')
     __items__ = ('text', 'icon_url')
+    __counted__ = ('text',)
 
     def __init__(self, text: str = None, icon_url: str = None):
         """Initiate the EmbedFooter object
@@ -80,7 +237,7 @@ class EmbedFooter(BaseSerializable):
     def text(self, text: str):
         if text is not None and not isinstance(text, str):
             raise TypeError('text must be string')
-        if len(text) > 2048:
+        if text is not None and len(text) > 2048:
             raise ValueError('text length must be up to 2048 characters')
         self._text = text
 
@@ -115,6 +272,7 @@ class EmbedImage(BaseSerializable):
     Attributes:
         url (str): source url of image (only supports http(s) and attachments)
     """
+    __slots__ = ('_url',)
     __items__ = ('url',)
 
     def __init__(self, url: str = None):
@@ -156,6 +314,7 @@ class EmbedThumbnail(BaseSerializable):
     Attributes:
         url (str): source url of thumbnail (only supports http(s) and attachments)
     """
+    __slots__ = ('_url',)
     __items__ = ('url',)
 
     def __init__(self, url: str = None):
@@ -199,7 +358,9 @@ class EmbedAuthor(BaseSerializable):
         url (str): url of author
         icon_url (str): url of author icon (only supports http(s) and attachments)
     """
+    __slots__ = ('_name', '_url', '_icon_url')
     __items__ = ('name', 'url', 'icon_url')
+    __counted__ = ('name',)
 
     def __init__(self, name: str = None, url: str = None, icon_url: str = None):
         """Initiate the EmbedAuthor object
@@ -222,7 +383,7 @@ class EmbedAuthor(BaseSerializable):
     def name(self, name: str):
         if name is not None and not isinstance(name, str):
             raise TypeError('name must be string')
-        if len(name) > 256:
+        if name is not None and len(name) > 256:
             raise ValueError('name length must be up to 256 characters')
         self._name = name
 
@@ -269,7 +430,9 @@ class EmbedField(BaseSerializable):
         name (str): name of the field
         value (str): value of the field
     """
+    __slots__ = ('_name', '_value')
     __items__ = ('name', 'value')
+    __counted__ = ('name', 'value')
 
     def __init__(self, name: str = None, value: str = None):
         """Initiate the EmbedField object
@@ -290,8 +453,8 @@ class EmbedField(BaseSerializable):
     def name(self, name: str):
         if name is not None and not isinstance(name, str):
             raise TypeError('name must be string')
-        if len(name) > 256:
-            raise ValueError('name length must be up to 256 characters')
+        if name is not None and len(name) > MAX_FIELD_NAME_LENGTH:
+            raise ValueError('name length must be up to {} characters'.format(MAX_FIELD_NAME_LENGTH))
         self._name = name
 
     @property
@@ -303,8 +466,8 @@ class EmbedField(BaseSerializable):
     def value(self, value: str):
         if value is not None and not isinstance(value, str):
             raise TypeError('value must be string')
-        if len(value) > 1024:
-            raise ValueError('value length must be up to 1024 characters')
+        if value is not None and len(value) > MAX_FIELD_VALUE_LENGTH:
+            raise ValueError('value length must be up to {} characters'.format(MAX_FIELD_VALUE_LENGTH))
         self._value = value
 
     @staticmethod
@@ -336,8 +499,12 @@ class Embed(BaseSerializable):
         author (EmbedAuthor): author object
         fields ([EmbedField]): field objects list
     """
+    __slots__ = ('_title', '_description', '_url', '_timestamp', '_color',
+                 '_footer', '_image', '_thumbnail', '_author', '_fields')
     __items__ = ('title', 'description', 'url', 'timestamp', 'color',
                  'footer', 'image', 'thumbnail', 'author', 'fields')
+    __nested__ = ('_footer', '_image', '_thumbnail', '_author', '_fields')
+    __counted__ = ('title', 'description')
 
     def __init__(self, title: str = None, description: str = None, url: str = None, timestamp: datetime = None,
                  color: int = None, footer: EmbedFooter = None, image: EmbedImage = None,
@@ -376,7 +543,7 @@ class Embed(BaseSerializable):
     def title(self, title: str):
         if title is not None and not isinstance(title, str):
             raise TypeError('title must be string')
-        if len(title) > 256:
+        if title is not None and len(title) > 256:
             raise ValueError('title length must be up to 256 characters')
         self._title = title
 
@@ -389,7 +556,7 @@ class Embed(BaseSerializable):
     def description(self, description: str):
         if description is not None and not isinstance(description, str):
             raise TypeError('description must be string')
-        if len(description) > 2048:
+        if description is not None and len(description) > 2048:
             raise ValueError('description length must be up to 2048 characters')
         self._description = description
 
@@ -482,8 +649,8 @@ class Embed(BaseSerializable):
             return
         if not isinstance(fields, list):
             raise TypeError('embeds must be list')
-        if len(fields) > 25:
-            raise ValueError('embed can contain up to 25 field objects')
+        if len(fields) > MAX_FIELDS:
+            raise ValueError('embed can contain up to {} field objects'.format(MAX_FIELDS))
         self._fields = []
         for field in fields:
             if isinstance(field, EmbedField):
@@ -493,14 +660,54 @@ class Embed(BaseSerializable):
             else:
                 raise TypeError('fields items must be EmbedField or dict')
 
+    def fields_left(self, field_length: int = 0, length_left: int = MAX_EMBEDS_LENGTH) -> int:
+        """Get how many more fields fit in the embed
+
+        Args:
+            field_length (int): The number of characters of the name and the value of every field.
+            length_left (int): The number of characters the message has left for this embed,
+                e.g. the length_left of the hook plus this embed's own length when it is in the hook.
+
+        Returns:
+            int: The number of fields of field_length that can be added without going over
+                the 25 fields of an embed or the characters left. 0 if none fit.
+        """
+        left = MAX_FIELDS - len(self._fields)
+        if field_length > 0:
+            left = min(left, (length_left - self.length) // field_length)
+        return max(0, left)
+
+    def fits(self, field: EmbedField, length_left: int = MAX_EMBEDS_LENGTH) -> bool:
+        """Check if a field can be added to the embed
+
+        Args:
+            field (EmbedField): The field.
+            length_left (int): The number of characters the message has left for this embed.
+
+        Returns:
+            bool: True if the field fits.
+        """
+        return len(self._fields) < MAX_FIELDS and self.length + field.length <= length_left
+
     @staticmethod
     def from_dict(obj: dict) -> 'Embed':
         """Abstract method for creating the object from dict
 
+        The nested objects (footer, image, thumbnail, author and fields) may be given as dicts too.
+
         Args:
             obj (dict): The dict the returned object will build from.
 
         Returns:
             Embed: The created object.
         """
+        obj = dict(obj)
+        for key, cls in _NESTED_TYPES:
+            value = obj.get(key)
+            if isinstance(value, dict):
+                obj[key] = cls.from_dict(value)
         return Embed(**obj)
+
+
+_NESTED_TYPES = (('footer', EmbedFooter), ('image', EmbedImage), ('thumbnail', EmbedThumbnail),
+                 ('author', EmbedAuthor))
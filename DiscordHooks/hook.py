@@ -1,34 +1,42 @@
 # -*- coding: utf-8 -*-
-import json
 import logging
-import requests
+import os
+import time
 
-from .embed import BaseSerializable, Embed, datetime
+from .attachment import Attachment, MultipartBody, MAX_FILES, MAX_UPLOAD_SIZE
+from .embed import Embed, MAX_EMBEDS_LENGTH, _measure, _versions
+from .metrics import SendEvent
+from .serializer import dumps, encoder_for
+from .transport import Transport, default_transport
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.ERROR)
 
-# create console handler and set level to debug
-ch = logging.StreamHandler()
-ch.setLevel(logging.DEBUG)
 
-# create formatter
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+def _add_query(url: str, query: str) -> str:
+    return '{}{}{}'.format(url, '&' if '?' in url else '?', query)
 
-# add formatter to ch
-ch.setFormatter(formatter)
 
-# add ch to logger
-logger.addHandler(ch)
+def _buffer(data):
+    """Get a bytes-like payload without copying it
 
+    Args:
+        data (bytes, bytearray or memoryview): The payload.
+
+    Returns:
+        bytes, bytearray or memoryview: The payload, as a flat view of bytes if it was a view of other items.
+    """
+    if isinstance(data, (bytes, bytearray)):
+        return data
+    if isinstance(data, memoryview):
+        # the Content-Length is the len() of the body, which counts the items of a view, not its bytes
+        return data if data.format == 'B' and data.ndim == 1 else data.cast('B')
+    raise TypeError('json_obj must be string, bytes, bytearray or memoryview')
 
-def encode_complex(obj):
-    if isinstance(obj, BaseSerializable):
-        return obj.dict
-    elif isinstance(obj, datetime):
-        return obj.isoformat()
 
-    raise TypeError(repr(obj) + " is not JSON serializable")
+def _message_url(hook_url: str, message_id) -> str:
+    # the query string of the webhook (e.g. thread_id) applies to its messages too
+    url, sep, query = hook_url.partition('?')
+    return '{}/messages/{}{}{}'.format(url.rstrip('/'), message_id, sep, query)
 
 
 class Hook:
@@ -42,6 +50,12 @@ class Hook:
     Note:
         Discord webhook must include at least one of content, file, embeds
 
+        Hooks with files are sent as multipart/form-data, and the files are streamed from their source,
+        so big files are never held in memory.
+
+        The json of the hook is cached, and the cache is invalidated whenever one of the items
+        is set, on the hook or on one of its embeds, so a hook sent many times is serialized once.
+
     Attributes:
         hook_url (str): The url which the data will be sent to. Mostly in this format:
             https://discordapp.com/api/webhooks/{webhook.id}/{webhook.token}
@@ -49,13 +63,22 @@ class Hook:
         username (str): Override the default username of the webhook.
         avatar_url (str): Override the default avatar of the webhook.
         tts (bool): True if this is a Text-To-Speech message.
-        file (bytes): The contents of the file being sent.
+        file (bytes): The file being sent: its contents, a path, a binary file object or an Attachment.
+        files ([Attachment]): More files being sent (up to 10 files with file).
         embeds ([Embed]): List of embed objects being sent.
+        transport (Transport): The transport the hook is sent with. The shared default transport when not set.
     """
-    __items__ = ('content', 'username', 'avatar_url', 'tts', 'file', 'embeds')
+    __slots__ = ('_hook_url', '_transport', '_content', '_username', '_avatar_url', '_tts', '_file', '_files',
+                 '_embeds', '_version', '_json_cache', '_measures')
+    # the items of the json payload (the files are sent as attachments next to it)
+    __items__ = ('content', 'username', 'avatar_url', 'tts', 'embeds')
+    __scalars__ = {'content': '_content', 'username': '_username', 'avatar_url': '_avatar_url', 'tts': '_tts'}
+    # the content has a limit of its own, it doesn't count toward the 6000 characters of the embeds
+    __counted__ = ()
 
     def __init__(self, hook_url: str = None, content: str = None, username: str = None, avatar_url: str = None,
-                 tts: bool = False, file: bytes = None, embeds: [Embed] = None):
+                 tts: bool = False, file: bytes = None, embeds: [Embed] = None, transport: Transport = None,
+                 files: [Attachment] = None):
         """Initiate the Hook object
 
         Args:
@@ -64,18 +87,61 @@ class Hook:
             username (str): Override the default username of the webhook.
             avatar_url (str): Override the default avatar of the webhook.
             tts (bool): True if this is a Text-To-Speech message.
-            file (bytes): The contents of the file being sent.
+            file (bytes): The file being sent: its contents, a path, a binary file object or an Attachment.
             embeds ([Embed]): List of embed objects being sent.
+            transport (Transport): The transport the hook is sent with.
+            files ([Attachment]): More files being sent (up to 10 files with file).
         """
         self.hook_url = hook_url
+        self.transport = transport
 
         self.content = content
         self.username = username
         self.avatar_url = avatar_url
         self.tts = tts
         self.file = file
+        self.files = files
         self.embeds = embeds
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.__items__:
+            super().__setattr__('_version', next(_versions))
+
+    @property
+    def size(self) -> int:
+        """int: The number of bytes of the json payload, from the measures of the hook and its embeds.
+
+        Takes time proportional to the number of embeds and fields, without serializing anything.
+        """
+        size, items, _ = _measure(self)
+        embeds = self._embeds
+        # "embeds":[...] is always sent, and a comma follows every scalar item
+        return size + items + len('"embeds":[]') + sum(embed.size for embed in embeds) \
+            + max(0, len(embeds) - 1)
+
+    @property
+    def length(self) -> int:
+        """int: The number of characters of the embeds, which Discord limits to 6000 per message."""
+        return sum(embed.length for embed in self._embeds)
+
+    @property
+    def length_left(self) -> int:
+        """int: The number of characters left for more embeds (or fields) in the message."""
+        return MAX_EMBEDS_LENGTH - self.length
+
+    def fits(self, *embeds: Embed) -> bool:
+        """Check if embeds can be added to the hook without going over Discord's limits
+
+        Args:
+            *embeds (Embed): The embeds.
+
+        Returns:
+            bool: True if the embeds fit in the 10 embeds and the 6000 characters of a message.
+        """
+        return len(self._embeds) + len(embeds) <= 10 \
+            and self.length + sum(embed.length for embed in embeds) <= MAX_EMBEDS_LENGTH
+
     @property
     def hook_url(self) -> str:
         """str: The url which the data will be sent to."""
@@ -87,6 +153,17 @@ class Hook:
             raise TypeError('hook_url must be string')
         self._hook_url = hook_url
 
+    @property
+    def transport(self) -> Transport:
+        """Transport: The transport the hook is sent with. The shared default transport when not set."""
+        return self._transport
+
+    @transport.setter
+    def transport(self, transport: Transport):
+        if transport is not None and not isinstance(transport, Transport):
+            raise TypeError('transport must be Transport')
+        self._transport = transport
+
     @property
     def content(self) -> str:
         """str: The message contents (up to 2000 characters)."""
@@ -135,13 +212,43 @@ class Hook:
 
     @property
     def file(self) -> bytes:
-        """bytes: The contents of the file being sent."""
+        """bytes: The file being sent: its contents, a path or an Attachment (file objects are wrapped in one)."""
         return self._file
 
     @file.setter
     def file(self, file: bytes):
+        if file is not None and not isinstance(file, (Attachment, bytes, bytearray, memoryview, str, os.PathLike)) \
+                and not hasattr(file, 'read'):
+            raise TypeError('file must be bytes, path, file object or Attachment')
+        if hasattr(file, 'read'):
+            # wrapped once, so the start position of the file is taken once however many times the hook is sent
+            file = Attachment(file)
         self._file = file
 
+    @property
+    def files(self) -> [Attachment]:
+        """[Attachment]: More files being sent (up to 10 files with file)."""
+        return self._files
+
+    @files.setter
+    def files(self, files: [Attachment]):
+        if files is None:
+            self._files = []
+            return
+        if not isinstance(files, list):
+            raise TypeError('files must be list')
+        if len(files) > MAX_FILES:
+            raise ValueError('hook can contain up to {} files'.format(MAX_FILES))
+        self._files = [Attachment.of(file) for file in files]
+
+    @property
+    def attachments(self) -> [Attachment]:
+        """[Attachment]: All the files being sent (file and files)."""
+        attachments = list(self._files)
+        if self._file is not None:
+            attachments.insert(0, Attachment.of(self._file))
+        return attachments
+
     @property
     def embeds(self) -> [Embed]:
         """[Embed]: List of embed objects being sent."""
@@ -166,14 +273,33 @@ class Hook:
     @property
     def json(self) -> str:
         """str: Generate json string of the webhook to be sent to the server"""
-        data = {key: getattr(self, key) for key in self.__items__ if getattr(self, key) is not None}
-
-        if not (data.get('content') or data.get('file') or data.get('embeds')):
+        versions = [self._version]
+        for embed in self._embeds:
+            collect = getattr(embed, '_collect_versions', None)
+            if collect is not None:
+                collect(versions)
+            else:
+                versions.append(id(embed))
+        signature = tuple(versions)
+        try:
+            cached_signature, json_obj = self._json_cache
+            if cached_signature == signature:
+                return json_obj
+        except AttributeError:
+            pass
+
+        if not (self._content or self._file is not None or self._files or self._embeds):
             raise AttributeError('You cant post an empty payload.')
+        # checked here, so an oversized message fails before it is sent instead of with a 400
+        if self.length > MAX_EMBEDS_LENGTH:
+            raise ValueError('embeds length must be up to {} characters'.format(MAX_EMBEDS_LENGTH))
 
-        return json.dumps(data, default=encode_complex)
+        json_obj = dumps(encoder_for(type(self))(self))
+        super().__setattr__('_json_cache', (signature, json_obj))
+        return json_obj
 
-    def execute(self, hook_url: str = None, json_obj: str = None):
+    def execute(self, hook_url: str = None, json_obj: str = None, transport: Transport = None,
+                event: SendEvent = None, wait: bool = False):
         """Execute the webhook (sending the message)
 
         Note:
@@ -185,20 +311,201 @@ class Hook:
 
         Args:
             hook_url (str): The url which the data will be sent to.
-            json_obj (str): The json string that will be sent.
+            json_obj (str): The json string that will be sent, or its utf-8 bytes (bytes, bytearray or memoryview),
+                which are sent as they are.
+            transport (Transport): The transport to send with instead of the hook's transport.
+            event (SendEvent): The measurements of the send so far, for the transport's instrumentation.
+            wait (bool): True to wait for the message to be created, and get it in the response
+                (response.json() is the message object, with its id).
+
+        Returns:
+            requests.Response: The response of the server.
         """
+        if transport is None:
+            transport = self.transport or default_transport()
+
+        started = time.perf_counter()
+        hook_url, data, headers = self._prepare(hook_url, json_obj)
+        if wait:
+            hook_url = _add_query(hook_url, 'wait=true')
+        if transport.instrumentation is not None:
+            event = event or SendEvent()
+            event.serialize_time += time.perf_counter() - started
+
+        result = transport.post(hook_url, data=data, headers=headers, event=event)
+        self._log_result(result)
+
+        return result
+
+    def edit_message(self, message_id: str, hook_url: str = None, json_obj: str = None, transport: Transport = None,
+                     event: SendEvent = None):
+        """Replace a message that was sent by the webhook with this hook
+
+        Note:
+            The username, avatar_url and tts of a message can't be edited, Discord ignores them.
+
+        Args:
+            message_id (str): The id of the message (from the response of execute with wait=True).
+            hook_url (str): The url of the webhook that sent the message.
+            json_obj (str): The json string that will be sent, or its utf-8 bytes (bytes, bytearray or memoryview),
+                which are sent as they are.
+            transport (Transport): The transport to send with instead of the hook's transport.
+            event (SendEvent): The measurements of the send so far, for the transport's instrumentation.
+
+        Returns:
+            requests.Response: The response of the server. response.json() is the edited message object.
+        """
+        if transport is None:
+            transport = self.transport or default_transport()
+
+        started = time.perf_counter()
+        hook_url, data, headers = self._prepare(hook_url, json_obj)
+        if transport.instrumentation is not None:
+            event = event or SendEvent()
+            event.serialize_time += time.perf_counter() - started
+
+        result = transport.request('PATCH', _message_url(hook_url, message_id), data=data, headers=headers,
+                                   event=event)
+        self._log_result(result)
+
+        return result
+
+    def delete_message(self, message_id: str, hook_url: str = None, transport: Transport = None):
+        """Delete a message that was sent by the webhook
+
+        Args:
+            message_id (str): The id of the message (from the response of execute with wait=True).
+            hook_url (str): The url of the webhook that sent the message.
+            transport (Transport): The transport to send with instead of the hook's transport.
+
+        Returns:
+            requests.Response: The response of the server.
+        """
+        if transport is None:
+            transport = self.transport or default_transport()
+
+        result = transport.request('DELETE', _message_url(self._url(hook_url), message_id))
+        self._log_result(result)
+
+        return result
+
+    async def execute_async(self, hook_url: str = None, json_obj: str = None, transport: 'AsyncTransport' = None,
+                            event: SendEvent = None, wait: bool = False):
+        """Execute the webhook (sending the message) without blocking the event loop
+
+        Note:
+            Requires aiohttp (pip install DiscordHooks[async]).
+            The arguments are the same as in execute.
+
+        Args:
+            hook_url (str): The url which the data will be sent to.
+            json_obj (str): The json string that will be sent, or its utf-8 bytes (bytes, bytearray or memoryview),
+                which are sent as they are.
+            transport (AsyncTransport): The transport to send with. The running loop's default transport when not set.
+            event (SendEvent): The measurements of the send so far, for the transport's instrumentation.
+            wait (bool): True to wait for the message to be created, and get it in the response.
+
+        Returns:
+            AsyncResponse: The response of the server.
+        """
+        if transport is None:
+            from .async_transport import default_async_transport
+            transport = default_async_transport()
+
+        started = time.perf_counter()
+        hook_url, data, headers = self._prepare(hook_url, json_obj)
+        if wait:
+            hook_url = _add_query(hook_url, 'wait=true')
+        if transport.instrumentation is not None:
+            event = event or SendEvent()
+            event.serialize_time += time.perf_counter() - started
+
+        result = await transport.post(hook_url, data=data, headers=headers, event=event)
+        self._log_result(result)
+
+        return result
+
+    async def edit_message_async(self, message_id: str, hook_url: str = None, json_obj: str = None,
+                                 transport: 'AsyncTransport' = None, event: SendEvent = None):
+        """Replace a message that was sent by the webhook with this hook, without blocking the event loop
+
+        Note:
+            The arguments are the same as in edit_message.
+
+        Returns:
+            AsyncResponse: The response of the server. response.json() is the edited message object.
+        """
+        if transport is None:
+            from .async_transport import default_async_transport
+            transport = default_async_transport()
+
+        started = time.perf_counter()
+        hook_url, data, headers = self._prepare(hook_url, json_obj)
+        if transport.instrumentation is not None:
+            event = event or SendEvent()
+            event.serialize_time += time.perf_counter() - started
+
+        result = await transport.request('PATCH', _message_url(hook_url, message_id), data=data, headers=headers,
+                                         event=event)
+        self._log_result(result)
+
+        return result
+
+    async def delete_message_async(self, message_id: str, hook_url: str = None, transport: 'AsyncTransport' = None):
+        """Delete a message that was sent by the webhook, without blocking the event loop
+
+        Note:
+            The arguments are the same as in delete_message.
+
+        Returns:
+            AsyncResponse: The response of the server.
+        """
+        if transport is None:
+            from .async_transport import default_async_transport
+            transport = default_async_transport()
+
+        result = await transport.request('DELETE', _message_url(self._url(hook_url), message_id))
+        self._log_result(result)
+
+        return result
+
+    def _prepare(self, hook_url: str, json_obj: str) -> (str, object, dict):
+        hook_url = self._url(hook_url)
+        data, headers = self._body(json_obj)
+        return hook_url, data, headers
+
+    def _url(self, hook_url: str) -> str:
         if not (hook_url or self.hook_url):
             raise AttributeError('hook_url is not set')
-        elif hook_url is None:
-            hook_url = self.hook_url
+        return hook_url or self.hook_url
 
-        if not (json_obj or self.json):
-            raise AttributeError('json_obj is not set')
-        elif json_obj is None:
+    def _body(self, json_obj) -> (object, dict):
+        if not json_obj:
             json_obj = self.json
-
-        result = requests.post(hook_url, data=json_obj, headers={'Content-Type': 'application/json'})
-
+        if isinstance(json_obj, str):
+            # the json may hold non-ascii characters, which must be sent as utf-8
+            payload = json_obj.encode('utf-8')
+        else:
+            # already utf-8, sent as it is
+            payload = _buffer(json_obj)
+
+        attachments = self.attachments
+        if not attachments:
+            return payload, {'Content-Type': 'application/json'}
+
+        if len(attachments) > MAX_FILES:
+            raise ValueError('hook can contain up to {} files'.format(MAX_FILES))
+        if sum(attachment.size or 0 for attachment in attachments) > MAX_UPLOAD_SIZE:
+            raise ValueError('files size must be up to {} bytes'.format(MAX_UPLOAD_SIZE))
+
+        body = MultipartBody(payload, attachments)
+        headers = {'Content-Type': body.content_type}
+        if body.len is not None:
+            headers['Content-Length'] = str(body.len)
+        return body, headers
+
+    @staticmethod
+    def _log_result(result):
         if 200 <= result.status_code <= 299:
             logger.info("Hook sent successfully. Code: {}".format(result.status_code))
         else:
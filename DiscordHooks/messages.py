@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from .hook import Hook
+from .transport import Transport, default_transport
+
+logger = logging.getLogger(__name__)
+
+
+class MessageIndex:
+    """Messages that are updated in place, by keys of the application
+
+    The first update of a key sends a new message (with wait=True, to learn its id), and the next updates
+    of the key edit that message instead of sending new ones, so a status that changes often stays one message.
+
+    With a debounce, the updates are sent `debounce` seconds after the first update that is not sent yet,
+    from a background thread, and only the latest state of every key is sent: ten updates of a key within
+    the debounce are one edit.
+
+    At most `maxsize` keys are indexed. When the index is full the key that was updated least recently
+    is forgotten, and its next update sends a new message.
+
+    Note:
+        Without a debounce the updates are sent on the calling thread, so updates of the same key
+        should not be sent from different threads at once (the first ones could create two messages).
+
+    Example:
+        index = MessageIndex(hook_url=webhook, debounce=1.0)
+        for status in statuses:
+            index.update(status.service, Hook(embeds=[status.embed()]))
+
+    Attributes:
+        hook_url (str): The url of the webhook. None to use the url of every hook.
+        maxsize (int): The maximum number of keys indexed.
+        debounce (float): The number of seconds updates wait for newer states of their key. 0 to send right away.
+        transport (Transport): The transport the messages are sent with. The hook's transport when not set.
+    """
+
+    def __init__(self, hook_url: str = None, maxsize: int = 1000, debounce: float = 0.0, transport: Transport = None):
+        """Initiate the MessageIndex object
+
+        Args:
+            hook_url (str): The url of the webhook. None to use the url of every hook.
+            maxsize (int): The maximum number of keys indexed.
+            debounce (float): The number of seconds updates wait for newer states of their key.
+            transport (Transport): The transport the messages are sent with.
+        """
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError('maxsize must be a positive int')
+        if debounce < 0:
+            raise ValueError('debounce must not be negative')
+        if transport is not None and not isinstance(transport, Transport):
+            raise TypeError('transport must be Transport')
+
+        self.hook_url = hook_url
+        self.maxsize = maxsize
+        self.debounce = debounce
+        self.transport = transport
+
+        # key -> (url, message id), the least recently updated first
+        self._index = OrderedDict()
+        # key -> (hook, url) of the updates that wait for the debounce, and the (deadline, order, key) heap of them
+        self._pending = {}
+        self._deadlines = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        """int: The number of keys indexed"""
+        return len(self._index)
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def message_id(self, key) -> str:
+        """Get the id of the message of a key
+
+        Args:
+            key: The key of the message.
+
+        Returns:
+            str: The id of the message. None if the key has no message (yet).
+        """
+        with self._condition:
+            entry = self._index.get(key)
+        return entry[1] if entry is not None else None
+
+    def update(self, key, hook: Hook, hook_url: str = None) -> str:
+        """Set the message of a key
+
+        Args:
+            key: The key of the message (any hashable).
+            hook (Hook): The new state of the message.
+            hook_url (str): The url of the webhook. The url of the index, or of the hook, when not set.
+
+        Returns:
+            str: The id of the message. None when the update waits for the debounce.
+        """
+        if not isinstance(hook, Hook):
+            raise TypeError('hook must be Hook')
+        hook_url = hook_url or self.hook_url or hook.hook_url
+        if not hook_url:
+            raise AttributeError('hook_url is not set')
+        if not self.debounce:
+            return self._send(key, hook, hook_url)
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('the index is closed')
+            pending = self._pending.get(key)
+            if pending is None:
+                order = next(self._order)
+                heapq.heappush(self._deadlines, (time.monotonic() + self.debounce, order, key))
+                self._condition.notify()
+            else:
+                order = pending[0]
+            # the order tells the deadline of the update from the stale deadlines of deleted updates of the key
+            self._pending[key] = (order, hook, hook_url)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name='DiscordHooks-messages', daemon=True)
+                self._thread.start()
+        return None
+
+    def delete(self, key) -> bool:
+        """Delete the message of a key, and forget the key
+
+        Args:
+            key: The key of the message.
+
+        Returns:
+            bool: True if the key had a message.
+        """
+        with self._condition:
+            self._pending.pop(key, None)
+            entry = self._index.pop(key, None)
+        if entry is None:
+            return False
+        url, message_id = entry
+        Hook().delete_message(message_id, url, self.transport or default_transport())
+        return True
+
+    def flush(self):
+        """Send all the updates that wait for the debounce now"""
+        with self._condition:
+            pending, self._pending = self._pending, {}
+            self._deadlines.clear()
+        for key, (_, hook, hook_url) in pending.items():
+            self._send_logged(key, hook, hook_url)
+
+    def close(self, timeout: float = None):
+        """Send the updates that wait for the debounce, and stop the background thread
+
+        Args:
+            timeout (float): The maximum number of seconds to wait for the background thread.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def __enter__(self) -> 'MessageIndex':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._deadlines:
+                        delay = self._deadlines[0][0] - time.monotonic()
+                        if delay <= 0:
+                            break
+                        self._condition.wait(delay)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    return
+                _, order, key = heapq.heappop(self._deadlines)
+                update = self._pending.get(key)
+                # stale when the key was deleted while it waited, and maybe updated again since
+                if update is not None and update[0] == order:
+                    del self._pending[key]
+                else:
+                    update = None
+            if update is not None:
+                self._send_logged(key, *update[1:])
+
+    def _send_logged(self, key, hook: Hook, hook_url: str):
+        try:
+            self._send(key, hook, hook_url)
+        except Exception:
+            logger.exception('Error while updating the message of %r', key)
+
+    def _send(self, key, hook: Hook, hook_url: str) -> str:
+        transport = self.transport or hook.transport or default_transport()
+        with self._condition:
+            entry = self._index.get(key)
+        if entry is not None and entry[0] == hook_url:
+            response = hook.edit_message(entry[1], hook_url, transport=transport)
+            if response.status_code != 404:
+                self._remember(key, hook_url, entry[1])
+                return entry[1] if 200 <= response.status_code <= 299 else None
+            # the message was deleted in Discord, a new one is sent instead
+
+        response = hook.execute(hook_url, transport=transport, wait=True)
+        if not 200 <= response.status_code <= 299:
+            return None
+        message_id = response.json()['id']
+        self._remember(key, hook_url, message_id)
+        return message_id
+
+    def _remember(self, key, hook_url: str, message_id: str):
+        with self._condition:
+            self._index[key] = (hook_url, message_id)
+            self._index.move_to_end(key)
+            if len(self._index) > self.maxsize:
+                self._index.popitem(last=False)
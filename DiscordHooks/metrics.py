@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class SendEvent:
+    """The measurements of one send, filled in along the way and reported when the send is done
+
+    Note:
+        The url is kept for custom instrumentations, the collectors of the package never export it,
+        since the url of a webhook holds its token.
+
+    Attributes:
+        url (str): The url the hook was sent to.
+        serialize_time (float): The number of seconds spent serializing the hook.
+        queue_wait (float): The number of seconds the hook waited in a dispatcher queue.
+        http_time (float): The number of seconds spent in HTTP requests, over all the attempts.
+        rate_limit_wait (float): The number of seconds spent waiting for the rate limit.
+        retry_wait (float): The number of seconds spent in the backoff between retries.
+        attempts (int): The number of HTTP requests sent, including retries and throttled requests.
+        bytes_sent (int): The number of body bytes sent, over all the attempts. None if unknown.
+        status_code (int): The status code of the last response, None if no response arrived.
+        exception (Exception): The error the send failed with, None if the server answered.
+        priority (str): The priority lane the hook was sent from, None if it wasn't sent by a Dispatcher.
+    """
+    __slots__ = ('url', 'serialize_time', 'queue_wait', 'http_time', 'rate_limit_wait', 'retry_wait', 'attempts',
+                 'bytes_sent', 'status_code', 'exception', 'priority')
+
+    def __init__(self, url: str = None, serialize_time: float = 0.0, queue_wait: float = 0.0, priority: str = None):
+        """Initiate the SendEvent object
+
+        Args:
+            url (str): The url the hook is sent to.
+            serialize_time (float): The number of seconds spent serializing the hook.
+            queue_wait (float): The number of seconds the hook waited in a dispatcher queue.
+            priority (str): The priority lane the hook is sent from.
+        """
+        self.url = url
+        self.serialize_time = serialize_time
+        self.queue_wait = queue_wait
+        self.priority = priority
+        self.http_time = 0.0
+        self.rate_limit_wait = 0.0
+        self.retry_wait = 0.0
+        self.attempts = 0
+        self.bytes_sent = 0
+        self.status_code = None
+        self.exception = None
+
+    @property
+    def retries(self) -> int:
+        """int: The number of requests sent after the first one."""
+        return max(0, self.attempts - 1)
+
+    @property
+    def total_time(self) -> float:
+        """float: The number of seconds from the hook entering the queue until the send was done."""
+        return self.serialize_time + self.queue_wait + self.http_time + self.rate_limit_wait + self.retry_wait
+
+    def add_attempt(self, seconds: float, size: int):
+        """Add the measurements of one HTTP request
+
+        Args:
+            seconds (float): The duration of the request.
+            size (int): The size of the body in bytes, None if unknown.
+        """
+        self.attempts += 1
+        self.http_time += seconds
+        if size is None or self.bytes_sent is None:
+            self.bytes_sent = None
+        else:
+            self.bytes_sent += size
+
+    def __repr__(self):
+        return '<SendEvent [{}] {:.1f}ms>'.format(self.status_code or self.exception, self.total_time * 1000)
+
+
+def body_size(data) -> int:
+    """Get the size of a request body in bytes
+
+    Args:
+        data: The body of the request.
+
+    Returns:
+        int: The size, None if it is unknown (a streamed body).
+    """
+    if data is None:
+        return 0
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    if isinstance(data, memoryview):
+        return data.nbytes
+    if isinstance(data, str):
+        return len(data.encode('utf-8'))
+    return getattr(data, 'len', None)
+
+
+class Instrumentation:
+    """The interface of the instrumentation of the sends
+
+    A transport with an instrumentation calls `record` once for every send, after the last attempt.
+    Subclasses override `record`; it is called on the sending thread (or the event loop),
+    so it should be quick and must not raise.
+    """
+
+    def record(self, event: SendEvent):
+        """Record the measurements of a send
+
+        Args:
+            event (SendEvent): The measurements of the send.
+        """
+
+
+class Instruments(Instrumentation):
+    """Several instrumentations recording the same sends
+
+    Attributes:
+        instrumentations ([Instrumentation]): The instrumentations every send is recorded by.
+    """
+
+    def __init__(self, *instrumentations: Instrumentation):
+        """Initiate the Instruments object
+
+        Args:
+            *instrumentations (Instrumentation): The instrumentations every send is recorded by.
+        """
+        for instrumentation in instrumentations:
+            if not isinstance(instrumentation, Instrumentation):
+                raise TypeError('instrumentations must be Instrumentation')
+        self.instrumentations = list(instrumentations)
+
+    def record(self, event: SendEvent):
+        for instrumentation in self.instrumentations:
+            try:
+                instrumentation.record(event)
+            except Exception:
+                logger.exception('Error while recording a send')
+
+
+class Histogram:
+    """A histogram of values in fixed buckets
+
+    Attributes:
+        buckets (tuple): The upper bounds of the buckets, in ascending order.
+        counts ([int]): The number of values in each bucket, and in the last cell the values above all of them.
+        count (int): The number of values.
+        sum (float): The sum of the values.
+        min (float): The smallest value, None if the histogram is empty.
+        max (float): The largest value, None if the histogram is empty.
+    """
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        """Initiate the Histogram object
+
+        Args:
+            buckets (tuple): The upper bounds of the buckets, in ascending order.
+        """
+        self.buckets = tuple(buckets)
+        if list(self.buckets) != sorted(self.buckets):
+            raise ValueError('buckets must be in ascending order')
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        """Add a value to the histogram
+
+        Args:
+            value (float): The value.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Estimate a percentile of the values, by interpolating inside its bucket
+
+        Args:
+            q (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The estimated value, None if the histogram is empty.
+        """
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                # the values of the bucket are between its bounds, and between the smallest and largest values
+                lower = max(self.buckets[index - 1] if index else self.min, self.min)
+                upper = min(self.buckets[index] if index < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+
+class MetricsCollector(Instrumentation):
+    """In-process collector of histograms and counters of the sends
+
+    Histograms (in seconds): serialize, queue_wait, http, rate_limit_wait, retry_wait and total.
+    Counters: sends (by status code, or 'error'), retries, bytes_sent.
+
+    The sends of a Dispatcher are also measured by their priority lane: a histogram of the total time
+    of the sends of every lane, and the number of them that took longer than the lane's latency SLO.
+
+    Attributes:
+        buckets (tuple): The upper bounds of the buckets of the histograms, in seconds.
+        slo (dict): The latency objective of every priority lane, in seconds.
+        histograms (dict): The histograms by name.
+        lanes (dict): The histograms of the total time of the sends of every priority lane.
+        slo_misses (dict): The number of sends of every priority lane that took longer than its SLO.
+        statuses (dict): The number of sends by status code ('error' for sends that failed without a response).
+        retries (int): The number of requests sent after the first one of their send.
+        bytes_sent (int): The number of body bytes sent.
+    """
+    HISTOGRAMS = ('serialize', 'queue_wait', 'http', 'rate_limit_wait', 'retry_wait', 'total')
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS, slo: dict = None):
+        """Initiate the MetricsCollector object
+
+        Args:
+            buckets (tuple): The upper bounds of the buckets of the histograms, in seconds.
+            slo (dict): The latency objective of every priority lane in seconds, e.g. {'critical': 1.0}.
+                The lanes without one are measured without counting misses.
+        """
+        if slo is not None and not all(isinstance(seconds, (int, float)) and seconds > 0 for seconds in slo.values()):
+            raise ValueError('slo must map the lanes to positive numbers of seconds')
+        self.buckets = tuple(buckets)
+        self.slo = dict(slo or {})
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything that was recorded"""
+        with self._lock:
+            self.histograms = {name: Histogram(self.buckets) for name in self.HISTOGRAMS}
+            self.lanes = {}
+            self.slo_misses = {}
+            self.statuses = {}
+            self.retries = 0
+            self.bytes_sent = 0
+
+    def record(self, event: SendEvent):
+        status = 'error' if event.status_code is None else event.status_code
+        with self._lock:
+            histograms = self.histograms
+            histograms['serialize'].observe(event.serialize_time)
+            histograms['queue_wait'].observe(event.queue_wait)
+            histograms['http'].observe(event.http_time)
+            histograms['rate_limit_wait'].observe(event.rate_limit_wait)
+            histograms['retry_wait'].observe(event.retry_wait)
+            histograms['total'].observe(event.total_time)
+            if event.priority is not None:
+                self._record_lane(event.priority, event.total_time)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.retries += event.retries
+            self.bytes_sent += event.bytes_sent or 0
+
+    def _record_lane(self, priority: str, seconds: float):
+        histogram = self.lanes.get(priority)
+        if histogram is None:
+            histogram = self.lanes[priority] = Histogram(self.buckets)
+            self.slo_misses[priority] = 0
+        histogram.observe(seconds)
+        slo = self.slo.get(priority)
+        if slo is not None and seconds > slo:
+            self.slo_misses[priority] += 1
+
+    def snapshot(self) -> dict:
+        """Get a summary of everything that was recorded
+
+        Returns:
+            dict: The count, sum, p50, p90 and p99 of every histogram (in seconds), the same for every
+                priority lane with its SLO and the fraction of its sends that met it, and the values of the counters.
+        """
+        with self._lock:
+            return {
+                'histograms': {name: _summary(histogram) for name, histogram in self.histograms.items()},
+                'lanes': {priority: dict(_summary(histogram), slo=self.slo.get(priority),
+                                         slo_met=1 - self.slo_misses[priority] / histogram.count
+                                         if priority in self.slo else None)
+                          for priority, histogram in self.lanes.items()},
+                'sends': dict(self.statuses),
+                'retries': self.retries,
+                'bytes_sent': self.bytes_sent,
+            }
+
+    def prometheus(self, prefix: str = 'discordhooks') -> str:
+        """Export everything that was recorded in the Prometheus text format
+
+        Args:
+            prefix (str): The prefix of the metric names.
+
+        Returns:
+            str: The metrics, ready to be served on a /metrics endpoint.
+        """
+        lines = []
+        with self._lock:
+            for name, histogram in self.histograms.items():
+                metric = '{}_{}_seconds'.format(prefix, name)
+                lines.append('# TYPE {} histogram'.format(metric))
+                _prometheus_histogram(lines, metric, '', histogram)
+
+            if self.lanes:
+                metric = '{}_lane_total_seconds'.format(prefix)
+                lines.append('# TYPE {} histogram'.format(metric))
+                for priority, histogram in sorted(self.lanes.items()):
+                    _prometheus_histogram(lines, metric, 'lane="{}",'.format(priority), histogram)
+                lines.append('# TYPE {}_lane_slo_seconds gauge'.format(prefix))
+                for priority, slo in sorted(self.slo.items()):
+                    lines.append('{}_lane_slo_seconds{{lane="{}"}} {}'.format(prefix, priority, slo))
+                lines.append('# TYPE {}_lane_slo_misses_total counter'.format(prefix))
+                for priority, misses in sorted(self.slo_misses.items()):
+                    lines.append('{}_lane_slo_misses_total{{lane="{}"}} {}'.format(prefix, priority, misses))
+
+            lines.append('# TYPE {}_sends_total counter'.format(prefix))
+            for status, count in sorted(self.statuses.items(), key=lambda item: str(item[0])):
+                lines.append('{}_sends_total{{status="{}"}} {}'.format(prefix, status, count))
+            lines.append('# TYPE {}_retries_total counter'.format(prefix))
+            lines.append('{}_retries_total {}'.format(prefix, self.retries))
+            lines.append('# TYPE {}_bytes_sent_total counter'.format(prefix))
+            lines.append('{}_bytes_sent_total {}'.format(prefix, self.bytes_sent))
+        return '\n'.join(lines) + '\n'
+
+
+def _summary(histogram: Histogram) -> dict:
+    return {'count': histogram.count, 'sum': histogram.sum, 'p50': histogram.percentile(50),
+            'p90': histogram.percentile(90), 'p99': histogram.percentile(99)}
+
+
+def _prometheus_histogram(lines: [str], metric: str, labels: str, histogram: Histogram):
+    # labels is empty, or the labels of the series followed by a comma
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append('{}_bucket{{{}le="{}"}} {}'.format(metric, labels, bound, cumulative))
+    lines.append('{}_bucket{{{}le="+Inf"}} {}'.format(metric, labels, histogram.count))
+    suffix = '{{{}}}'.format(labels.rstrip(',')) if labels else ''
+    lines.append('{}_sum{} {}'.format(metric, suffix, histogram.sum))
+    lines.append('{}_count{} {}'.format(metric, suffix, histogram.count))
+
+
+class StatsDExporter(Instrumentation):
+    """Exporter of the sends to a StatsD server, over UDP
+
+    Every send is reported as timers (in milliseconds) of its serialize, queue_wait, http, rate_limit_wait,
+    retry_wait and total times (and of its total time by its priority lane, when a Dispatcher sent it),
+    and counters of its status code, retries and bytes sent.
+    Packets that can't be sent are dropped, so a missing StatsD server never slows the sends down.
+
+    Attributes:
+        host (str): The host of the StatsD server.
+        port (int): The port of the StatsD server.
+        prefix (str): The prefix of the metric names.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8125, prefix: str = 'discordhooks'):
+        """Initiate the StatsDExporter object
+
+        Args:
+            host (str): The host of the StatsD server.
+            port (int): The port of the StatsD server.
+            prefix (str): The prefix of the metric names.
+        """
+        self.host = host
+        self.port = port
+        self.prefix = prefix
+        import socket
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def record(self, event: SendEvent):
+        prefix = self.prefix
+        status = 'error' if event.status_code is None else event.status_code
+        lines = ['{}.{}:{:.3f}|ms'.format(prefix, name, seconds * 1000) for name, seconds in (
+            ('serialize', event.serialize_time), ('queue_wait', event.queue_wait), ('http', event.http_time),
+            ('rate_limit_wait', event.rate_limit_wait), ('retry_wait', event.retry_wait),
+            ('total', event.total_time))]
+        if event.priority is not None:
+            lines.append('{}.lane.{}.total:{:.3f}|ms'.format(prefix, event.priority, event.total_time * 1000))
+        lines.append('{}.sends.{}:1|c'.format(prefix, status))
+        if event.retries:
+            lines.append('{}.retries:{}|c'.format(prefix, event.retries))
+        if event.bytes_sent:
+            lines.append('{}.bytes_sent:{}|c'.format(prefix, event.bytes_sent))
+        try:
+            self._socket.sendto('\n'.join(lines).encode('utf-8'), (self.host, self.port))
+        except OSError as e:
+            logger.debug('Error while sending metrics to StatsD: {}'.format(e))
+
+    def close(self):
+        """Close the socket"""
+        self._socket.close()
@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+"""Local stand-in for Discord's webhook execute endpoint, for load tests and offline checks
+
+The server accepts POST /api/webhooks/<id>/<token> (with ?wait=true too) with a json or a multipart/form-data
+body, and PATCH and DELETE /api/webhooks/<id>/<token>/messages/<message_id> to edit and delete the messages.
+It validates the payload roughly like Discord does, and answers with Discord's status codes,
+rate limit headers and error bodies. Latency, failures and rate limits are configurable,
+and every request is counted.
+
+Usage:
+    python -m DiscordHooks.mock_server [--port 8080] [--latency 0.05] [--failure-rate 0.01]
+                                      [--bucket-limit 5] [--bucket-window 2] [--global-limit 50]
+"""
+import argparse
+import email.parser
+import email.policy
+import itertools
+import json
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+MAX_CONTENT_LENGTH = 2000
+MAX_EMBEDS = 10
+
+
+class _Window:
+    """A fixed rate limit window, like the buckets of Discord"""
+    __slots__ = ('limit', 'length', 'started', 'used')
+
+    def __init__(self, limit: int, length: float):
+        self.limit = limit
+        self.length = length
+        self.started = 0.0
+        self.used = 0
+
+    def take(self, now: float) -> float:
+        """Count a request in the window
+
+        Returns:
+            float: 0 if the request is allowed, else the number of seconds until the window resets.
+        """
+        if now - self.started >= self.length:
+            self.started = now
+            self.used = 0
+        if self.used >= self.limit:
+            return self.started + self.length - now
+        self.used += 1
+        return 0.0
+
+    def reset_after(self, now: float) -> float:
+        return max(0.0, self.started + self.length - now)
+
+
+class MockDiscordServer:
+    """Local mock of Discord's webhook execute endpoint
+
+    Every webhook (id and token) gets its own rate limit bucket of `bucket_limit` requests per
+    `bucket_window` seconds (and another one for the edits and deletes of its messages), and all of them share
+    the global limit of `global_limit` requests per second. Requests over a limit are answered with 429,
+    the X-RateLimit-* and Retry-After headers and a json body with retry_after, like Discord does.
+    Accepted messages are answered with 204 after `latency` seconds, or with 200 and the message object
+    when ?wait=true was given. The last `keep` messages can be edited and deleted.
+
+    Attributes:
+        host (str): The host the server listens on.
+        port (int): The port the server listens on (chosen by the system when 0 was given).
+        latency (float): The number of seconds every response is delayed.
+        jitter (float): Up to this many more seconds are added to the latency, at random.
+        failure_rate (float): The probability of a request to fail with failure_status.
+        failure_status (int): The status code of the failures.
+        bucket_limit (int): The number of requests per bucket window of every webhook.
+        bucket_window (float): The length of a bucket window in seconds.
+        global_limit (int): The number of requests per second of all the webhooks together. None for no limit.
+        keep (int): The number of accepted messages kept in `messages`, and that can be edited.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, failure_status: int = 500, bucket_limit: int = 5,
+                 bucket_window: float = 2.0, global_limit: int = None, keep: int = 1000, seed: int = None):
+        """Initiate the MockDiscordServer object and bind its socket
+
+        Args:
+            host (str): The host to listen on.
+            port (int): The port to listen on. 0 for any free port.
+            latency (float): The number of seconds every response is delayed.
+            jitter (float): Up to this many more seconds are added to the latency, at random.
+            failure_rate (float): The probability of a request to fail with failure_status.
+            failure_status (int): The status code of the failures.
+            bucket_limit (int): The number of requests per bucket window of every webhook.
+            bucket_window (float): The length of a bucket window in seconds.
+            global_limit (int): The number of requests per second of all the webhooks together. None for no limit.
+            keep (int): The number of accepted messages kept in `messages`, and that can be edited.
+            seed (int): The seed of the random failures and jitter, for reproducible runs.
+        """
+        if not 0 <= failure_rate <= 1:
+            raise ValueError('failure_rate must be between 0 and 1')
+        if not isinstance(bucket_limit, int) or bucket_limit < 1:
+            raise ValueError('bucket_limit must be a positive int')
+        if global_limit is not None and (not isinstance(global_limit, int) or global_limit < 1):
+            raise ValueError('global_limit must be a positive int')
+
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.bucket_limit = bucket_limit
+        self.bucket_window = bucket_window
+        self.global_limit = global_limit
+        self.keep = keep
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1000000000000000000)
+        self._buckets = {}
+        self._global = _Window(global_limit, 1.0) if global_limit is not None else None
+        self.reset()
+
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+        self._serving = False
+
+    @property
+    def url(self) -> str:
+        """str: The base url of the server."""
+        return 'http://{}:{}'.format(self.host, self.port)
+
+    def webhook_url(self, webhook_id: int = 1, token: str = 'token') -> str:
+        """Get the url of a webhook on the server
+
+        Args:
+            webhook_id (int): The id of the webhook.
+            token (str): The token of the webhook.
+
+        Returns:
+            str: The url to execute the webhook with.
+        """
+        return '{}/api/webhooks/{}/{}'.format(self.url, webhook_id, token)
+
+    def stats(self) -> dict:
+        """Get the request counters
+
+        Returns:
+            dict: The number of requests, accepted, edited, deleted, rate_limited, global_rate_limited,
+                failed (injected failures), bad_requests, unknown_messages, bytes_received and files,
+                and the number of accepted messages of every webhook.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats['webhooks'] = dict(self._webhooks)
+            return stats
+
+    @property
+    def messages(self) -> [dict]:
+        """[dict]: The last accepted payloads, with the key 'webhook' and the names of the files under 'files'."""
+        with self._lock:
+            return list(self._messages)
+
+    def message(self, message_id: str) -> dict:
+        """Get the current state of a message, as Discord would return it
+
+        Args:
+            message_id (str): The id of the message.
+
+        Returns:
+            dict: The message object. None if the message was deleted, or is not kept anymore.
+        """
+        with self._lock:
+            message = self._stored.get(str(message_id))
+            return dict(message) if message is not None else None
+
+    def reset(self):
+        """Reset the counters, the kept messages and the rate limits"""
+        with self._lock:
+            self._counters = dict.fromkeys(('requests', 'accepted', 'edited', 'deleted', 'rate_limited',
+                                            'global_rate_limited', 'failed', 'bad_requests', 'unknown_messages',
+                                            'bytes_received', 'files'), 0)
+            self._webhooks = {}
+            self._messages = deque(maxlen=self.keep)
+            self._stored = OrderedDict()
+            self._buckets.clear()
+            if self._global is not None:
+                self._global = _Window(self.global_limit, 1.0)
+
+    def start(self) -> 'MockDiscordServer':
+        """Serve in a background thread
+
+        Returns:
+            MockDiscordServer: The server itself.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name='DiscordHooks-mock-server',
+                                            daemon=True)
+            self._serving = True
+            self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve on the current thread until stop is called"""
+        self._serving = True
+        self._server.serve_forever()
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        if self._serving:
+            self._server.shutdown()
+            self._serving = False
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'MockDiscordServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _handle(self, webhook: str, content_type: str, body: bytes, method: str = 'POST', message_id: str = None,
+                wait: bool = False) -> (int, dict, dict):
+        """Handle an execute request, or an edit or delete of a message
+
+        Returns:
+            (int, dict, dict): The status code, the headers and the json body (None for no body) of the response.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._counters['requests'] += 1
+            self._counters['bytes_received'] += len(body)
+
+            if self._global is not None:
+                retry_after = self._global.take(now)
+                if retry_after:
+                    self._counters['global_rate_limited'] += 1
+                    return 429, {'X-RateLimit-Global': 'true', 'X-RateLimit-Scope': 'global',
+                                 'Retry-After': '{:.3f}'.format(retry_after)}, \
+                        {'message': 'You are being rate limited.', 'retry_after': round(retry_after, 3),
+                         'global': True}
+
+            route = webhook if method == 'POST' else webhook + '/messages'
+            bucket = self._buckets.get(route)
+            if bucket is None:
+                bucket = self._buckets[route] = _Window(self.bucket_limit, self.bucket_window)
+            retry_after = bucket.take(now)
+            headers = {'X-RateLimit-Limit': str(bucket.limit),
+                       'X-RateLimit-Remaining': str(max(0, bucket.limit - bucket.used)),
+                       'X-RateLimit-Reset': '{:.3f}'.format(time.time() + bucket.reset_after(now)),
+                       'X-RateLimit-Reset-After': '{:.3f}'.format(bucket.reset_after(now)),
+                       'X-RateLimit-Bucket': route.replace(webhook, webhook.split('/')[0])}
+            if retry_after:
+                self._counters['rate_limited'] += 1
+                headers['X-RateLimit-Scope'] = 'user'
+                headers['Retry-After'] = '{:.3f}'.format(retry_after)
+                return 429, headers, {'message': 'You are being rate limited.', 'retry_after': round(retry_after, 3),
+                                      'global': False}
+
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            failed = self.failure_rate and self._random.random() < self.failure_rate
+
+        if delay:
+            time.sleep(delay)
+        if failed:
+            self._count('failed')
+            return self.failure_status, headers, {'message': 'Internal Server Error', 'code': 0}
+
+        if method == 'DELETE':
+            with self._lock:
+                if self._stored.pop(message_id, None) is None:
+                    self._counters['unknown_messages'] += 1
+                    return 404, headers, {'message': 'Unknown Message', 'code': 10008}
+                self._counters['deleted'] += 1
+            return 204, headers, None
+
+        try:
+            payload, files = _parse(content_type, body)
+            error = _validate(payload, files, edit=method == 'PATCH')
+        except ValueError as e:
+            error = str(e)
+        if error is not None:
+            self._count('bad_requests')
+            return 400, headers, {'message': 'Invalid Form Body', 'code': 50035, 'errors': error}
+
+        if method == 'PATCH':
+            with self._lock:
+                message = self._stored.get(message_id)
+                if message is None:
+                    self._counters['unknown_messages'] += 1
+                    return 404, headers, {'message': 'Unknown Message', 'code': 10008}
+                for key in ('content', 'embeds'):
+                    if key in payload:
+                        message[key] = payload[key] or ([] if key == 'embeds' else '')
+                if files:
+                    message['attachments'] = [{'filename': name} for name in files]
+                message['edited_timestamp'] = _now()
+                self._counters['edited'] += 1
+                self._counters['files'] += len(files)
+                return 200, headers, dict(message)
+
+        message = {'id': str(next(self._ids)), 'type': 0, 'channel_id': '0', 'webhook_id': webhook.split('/')[0],
+                   'content': payload.get('content') or '', 'embeds': payload.get('embeds') or [],
+                   'attachments': [{'filename': name} for name in files], 'tts': bool(payload.get('tts')),
+                   'timestamp': _now(), 'edited_timestamp': None}
+        payload['webhook'] = webhook
+        payload['files'] = files
+        with self._lock:
+            self._counters['accepted'] += 1
+            self._counters['files'] += len(files)
+            self._webhooks[webhook] = self._webhooks.get(webhook, 0) + 1
+            self._messages.append(payload)
+            if self.keep:
+                self._stored[message['id']] = message
+                if len(self._stored) > self.keep:
+                    self._stored.popitem(last=False)
+        if wait:
+            return 200, headers, dict(message)
+        return 204, headers, None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _parse(content_type: str, body: bytes) -> (dict, [str]):
+    if content_type.startswith('application/json'):
+        return json.loads(body.decode('utf-8')), []
+
+    if content_type.startswith('multipart/form-data'):
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+        payload, files = {}, []
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if name == 'payload_json':
+                payload = json.loads(part.get_payload(decode=True).decode('utf-8'))
+            elif part.get_filename() is not None:
+                files.append(part.get_filename())
+        return payload, files
+
+    raise ValueError('unsupported Content-Type {!r}'.format(content_type))
+
+
+def _validate(payload: dict, files: [str], edit: bool = False) -> str:
+    if not isinstance(payload, dict):
+        return 'the payload must be a json object'
+    content = payload.get('content')
+    embeds = payload.get('embeds') or []
+    if not (content or embeds or files or edit):
+        return 'Cannot send an empty message'
+    if content is not None and len(content) > MAX_CONTENT_LENGTH:
+        return 'content: Must be {} or fewer in length.'.format(MAX_CONTENT_LENGTH)
+    if len(embeds) > MAX_EMBEDS:
+        return 'embeds: Must be {} or fewer in length.'.format(MAX_EMBEDS)
+    return None
+
+
+def _make_handler(server: MockDiscordServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self._dispatch('POST')
+
+        def do_PATCH(self):
+            self._dispatch('PATCH')
+
+        def do_DELETE(self):
+            self._dispatch('DELETE')
+
+        def _dispatch(self, method: str):
+            body = self._read_body()
+            url = urlsplit(self.path)
+            parts = url.path.strip('/').split('/')
+            if parts[:2] != ['api', 'webhooks'] or len(parts) != (4 if method == 'POST' else 6) \
+                    or (method != 'POST' and parts[4] != 'messages'):
+                self._respond(404, {}, {'message': 'Unknown Webhook', 'code': 10015})
+                return
+            wait = parse_qs(url.query).get('wait', ['false'])[-1].lower() == 'true'
+            status, headers, response = server._handle('/'.join(parts[2:4]), self.headers.get('Content-Type', ''),
+                                                        body, method, parts[5] if method != 'POST' else None, wait)
+            self._respond(status, headers, response)
+
+        def _read_body(self) -> bytes:
+            if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                chunks = []
+                while True:
+                    size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                    if not size:
+                        self.rfile.readline()
+                        return b''.join(chunks)
+                    chunks.append(self.rfile.read(size))
+                    self.rfile.readline()
+            return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        def _respond(self, status: int, headers: dict, body: dict):
+            data = json.dumps(body).encode('utf-8') if body is not None else b''
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if body is not None:
+                self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local mock of the Discord webhook execute endpoint')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds every response is delayed')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many more seconds of latency')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='probability of a request to fail')
+    parser.add_argument('--failure-status', type=int, default=500)
+    parser.add_argument('--bucket-limit', type=int, default=5, help='requests per bucket window of every webhook')
+    parser.add_argument('--bucket-window', type=float, default=2.0, help='seconds of a bucket window')
+    parser.add_argument('--global-limit', type=int, default=None, help='requests per second of all the webhooks')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = MockDiscordServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                               failure_rate=args.failure_rate, failure_status=args.failure_status,
+                               bucket_limit=args.bucket_limit, bucket_window=args.bucket_window,
+                               global_limit=args.global_limit, seed=args.seed)
+    print('Serving webhooks on {} (e.g. {})'.format(server.url, server.webhook_url()))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+
+from .hook import Hook
+from .transport import Transport, default_transport
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """Durable on-disk queue of webhook payloads
+
+    Payloads put in the outbox are stored in an SQLite database, and stay there until Discord accepted them,
+    so messages survive restarts and outages. The outbox is drained in the order the payloads were put,
+    and a payload is removed only after it was sent successfully (at-least-once delivery),
+    so a restart resumes exactly where sending left off.
+
+    The database is in WAL mode. With the default synchronous='NORMAL' commits are not fsynced one by one,
+    the WAL is fsynced at checkpoints, so many puts share one fsync; a crash of the process loses nothing,
+    a power loss may lose the last commits. Use synchronous='FULL' to fsync every commit.
+    Rows of sent payloads are deleted, and the file is compacted after every `compact_every` deletions.
+
+    Payloads that Discord rejects for good (4xx other than 429) are kept aside as dead, and are not sent again.
+
+    Attributes:
+        path (str): The path of the database file.
+        transport (Transport): The transport the payloads are sent with. The shared default transport when not set.
+        compact_every (int): The number of sent payloads after which the database file is compacted.
+    """
+
+    def __init__(self, path: str, transport: Transport = None, synchronous: str = 'NORMAL',
+                 compact_every: int = 10000):
+        """Initiate the Outbox object and open (or create) its database
+
+        Args:
+            path (str): The path of the database file.
+            transport (Transport): The transport the payloads are sent with.
+            synchronous (str): The SQLite synchronous mode: 'OFF', 'NORMAL' or 'FULL'.
+            compact_every (int): The number of sent payloads after which the database file is compacted.
+        """
+        if transport is not None and not isinstance(transport, Transport):
+            raise TypeError('transport must be Transport')
+        if synchronous not in ('OFF', 'NORMAL', 'FULL'):
+            raise ValueError("synchronous must be one of 'OFF', 'NORMAL', 'FULL'")
+        if not isinstance(compact_every, int) or compact_every < 1:
+            raise ValueError('compact_every must be a positive int')
+
+        self.path = path
+        self.transport = transport
+        self.compact_every = compact_every
+
+        self._lock = threading.RLock()
+        import sqlite3
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous={}'.format(synchronous))
+        self._db.execute('CREATE TABLE IF NOT EXISTS outbox ('
+                         'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                         'url TEXT NOT NULL, '
+                         'payload BLOB NOT NULL, '
+                         'attempts INTEGER NOT NULL DEFAULT 0, '
+                         'dead INTEGER NOT NULL DEFAULT 0)')
+        self._sent_since_compact = 0
+
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        # True while the thread runs, cleared under the lock when it stops
+        self._draining = False
+        # set when close gave up waiting for the thread, which then closes the database when it stops
+        self._close_on_exit = False
+
+    def put(self, hook: Hook, hook_url: str = None):
+        """Put a hook in the outbox
+
+        The hook is serialized now, so later changes of the hook don't change the stored payload.
+        Only the json payload is stored, so hooks with files can't be put in the outbox.
+
+        Args:
+            hook (Hook): The hook to send.
+            hook_url (str): The url which the data will be sent to. The hook's url when not set.
+        """
+        if not isinstance(hook, Hook):
+            raise TypeError('hook must be Hook')
+        if hook.attachments:
+            raise ValueError('hooks with files can\'t be put in the outbox')
+        self.put_many([(hook_url or hook.hook_url, hook.json)])
+
+    def put_many(self, payloads: [(str, str)]):
+        """Put many serialized payloads in the outbox, in one transaction
+
+        Args:
+            payloads ([(str, str)]): Pairs of the url and the json payload (str or bytes) to send to it.
+        """
+        rows = []
+        for hook_url, json_obj in payloads:
+            if not hook_url:
+                raise AttributeError('hook_url is not set')
+            if not json_obj:
+                raise AttributeError('json_obj is not set')
+            rows.append((hook_url, json_obj.encode('utf-8') if isinstance(json_obj, str) else bytes(json_obj)))
+
+        with self._lock:
+            with self._db:
+                self._db.execute('BEGIN')
+                self._db.executemany('INSERT INTO outbox (url, payload) VALUES (?, ?)', rows)
+        self._wakeup.set()
+
+    def __len__(self) -> int:
+        """int: The number of payloads waiting to be sent"""
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM outbox WHERE dead = 0').fetchone()[0]
+
+    def dead(self) -> [(str, bytes, int)]:
+        """Get the payloads Discord rejected for good
+
+        Returns:
+            [(str, bytes, int)]: The url, the payload and the number of attempts of each dead payload.
+        """
+        with self._lock:
+            return self._db.execute('SELECT url, payload, attempts FROM outbox WHERE dead = 1 ORDER BY id').fetchall()
+
+    def drain(self, batch_size: int = 100) -> int:
+        """Send the waiting payloads, in the order they were put
+
+        Draining stops at the first payload that can't be sent right now (a connection error or a 5xx),
+        and that payload is the first to be sent by the next drain. It also stops between payloads
+        once the outbox is closed.
+
+        Args:
+            batch_size (int): The number of payloads read from the database at once.
+
+        Returns:
+            int: The number of payloads that were sent.
+        """
+        transport = self.transport or default_transport()
+        sent = 0
+        while not self._stopped.is_set():
+            with self._lock:
+                rows = self._db.execute('SELECT id, url, payload FROM outbox WHERE dead = 0 ORDER BY id LIMIT ?',
+                                        (batch_size,)).fetchall()
+            if not rows:
+                return sent
+
+            acked = []
+            try:
+                for row_id, url, payload in rows:
+                    if self._stopped.is_set():
+                        return sent + len(acked)
+                    try:
+                        result = transport.post(url, data=payload, headers={'Content-Type': 'application/json'})
+                    except Exception as e:
+                        logger.warning("Error while sending from the outbox: {}".format(e))
+                        self._failed(row_id, dead=False)
+                        return sent + len(acked)
+
+                    if 200 <= result.status_code <= 299:
+                        acked.append(row_id)
+                    elif 400 <= result.status_code <= 499 and result.status_code != 429:
+                        logger.error("Discord rejected a payload of the outbox. ERROR {}: '{}'"
+                                     .format(result.status_code, result.content))
+                        self._failed(row_id, dead=True)
+                    else:
+                        logger.warning("Error while sending from the outbox. ERROR {}".format(result.status_code))
+                        self._failed(row_id, dead=False)
+                        return sent + len(acked)
+            finally:
+                self._ack(acked)
+            sent += len(acked)
+        return sent
+
+    def compact(self):
+        """Give the space of the sent payloads back to the file system"""
+        with self._lock:
+            self._db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self._db.execute('VACUUM')
+            self._sent_since_compact = 0
+
+    def start(self, interval: float = 1.0):
+        """Start draining the outbox in a background thread
+
+        The thread drains the outbox whenever payloads are put, and retries every `interval` seconds
+        while there are payloads that couldn't be sent.
+
+        Args:
+            interval (float): The number of seconds between retries.
+        """
+        if self._thread is not None:
+            raise RuntimeError('the outbox is already started')
+        self._thread = threading.Thread(target=self._work, args=(interval,), name='DiscordHooks-outbox',
+                                        daemon=True)
+        self._draining = True
+        self._thread.start()
+
+    def close(self, timeout: float = None):
+        """Stop the background thread and close the database
+
+        Payloads that were not sent yet stay in the database, for the next time it is opened.
+        The thread stops after the payload it is sending. If it is still sending when the timeout passes,
+        it closes the database itself when it stops.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait for the background thread.
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._lock:
+            if self._draining:
+                self._close_on_exit = True
+            else:
+                self._db.close()
+
+    def __enter__(self) -> 'Outbox':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _work(self, interval: float):
+        try:
+            while not self._stopped.is_set():
+                self._wakeup.clear()
+                try:
+                    self.drain()
+                    waiting = len(self)
+                except Exception:
+                    logger.exception('Error while draining the outbox')
+                    waiting = True
+                if waiting:
+                    # some payloads couldn't be sent, try again later
+                    self._stopped.wait(interval)
+                else:
+                    self._wakeup.wait()
+        finally:
+            with self._lock:
+                self._draining = False
+                if self._close_on_exit:
+                    self._db.close()
+
+    def _ack(self, row_ids: [int]):
+        if not row_ids:
+            return
+        with self._lock:
+            with self._db:
+                self._db.execute('BEGIN')
+                self._db.executemany('DELETE FROM outbox WHERE id = ?', ((row_id,) for row_id in row_ids))
+            self._sent_since_compact += len(row_ids)
+            if self._sent_since_compact >= self.compact_every:
+                self.compact()
+
+    def _failed(self, row_id: int, dead: bool):
+        with self._lock:
+            with self._db:
+                self._db.execute('UPDATE outbox SET attempts = attempts + 1, dead = ? WHERE id = ?',
+                                 (int(dead), row_id))
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import threading
+from collections import deque
+
+from .dispatcher import Dispatcher
+from .hook import Hook
+from .transport import Transport
+
+logger = logging.getLogger(__name__)
+
+# the build function of the worker process, set once by the pool's initializer instead of pickled with every chunk
+_build = None
+
+
+def _init_worker(build: callable):
+    global _build
+    _build = build
+
+
+def _build_chunk(start: int, records: list) -> [(str, str)]:
+    payloads = []
+    for index, record in enumerate(records, start):
+        try:
+            hook = _build(record)
+            if hook is None:
+                continue
+            if isinstance(hook, str):
+                payloads.append((None, hook))
+                continue
+            if not isinstance(hook, Hook):
+                raise TypeError('build must return Hook, str or None')
+            if hook.attachments:
+                raise ValueError('hooks with files can not be built in a pipeline')
+            payloads.append((hook.hook_url, hook.json))
+        except Exception as e:
+            # the traceback stays in the worker, so the message tells which record failed
+            raise ValueError('record {}: {!r}'.format(index, e)) from e
+    return payloads
+
+
+class ProcessPipeline:
+    """Building and serializing of many messages in a pool of processes, and sending them from this one
+
+    The records are handed to the worker processes in chunks. Each worker calls `build` on every record
+    of its chunk, serializes the hook it returns, and sends back only the url and the json string,
+    so the CPU work (the models' validation and the json encoding) runs on all the cores.
+
+    This process only does the I/O: the payloads are sent by one Dispatcher over one Transport,
+    so a single RateLimiter paces every send and the workers can never exceed a bucket.
+
+    At most `max_pending` chunks are in the pool at a time, and the payloads come back in the order
+    of the records, so a stream of any length is sent in bounded memory.
+
+    Note:
+        `build` and the records are pickled to the workers: `build` must be a module level function,
+        and the records must be picklable (dicts, tuples, dataclasses...).
+
+    Example:
+        def build(row):
+            return Hook(embeds=[Embed(title=row['host'], fields=[EmbedField(name='CPU', value=row['cpu'])])])
+
+        if __name__ == '__main__':
+            with ProcessPipeline(build, hook_url=webhook) as pipeline:
+                print(pipeline.send(rows))
+
+    Attributes:
+        build (callable): Takes a record and returns its Hook (or a json string, or None to skip the record).
+        processes (int): The number of worker processes.
+        chunk_size (int): The number of records sent to a worker at once.
+        max_pending (int): The maximum number of chunks in the pool at once.
+        hook_url (str): The url of the hooks that have no url of their own.
+        dispatcher (Dispatcher): The dispatcher the payloads are sent by.
+    """
+
+    def __init__(self, build: callable, processes: int = None, chunk_size: int = 100, max_pending: int = None,
+                 hook_url: str = None, dispatcher: Dispatcher = None, transport: Transport = None, senders: int = 8):
+        """Initiate the ProcessPipeline object and start its processes
+
+        Args:
+            build (callable): Takes a record and returns its Hook (or a json string, or None to skip the record).
+            processes (int): The number of worker processes. The number of CPUs when not set.
+            chunk_size (int): The number of records sent to a worker at once.
+            max_pending (int): The maximum number of chunks in the pool at once. 4 per process when not set.
+            hook_url (str): The url of the hooks that have no url of their own.
+            dispatcher (Dispatcher): The dispatcher to send with. A new one, closed with the pipeline, when not set.
+            transport (Transport): The transport of the new dispatcher.
+            senders (int): The number of threads of the new dispatcher.
+        """
+        if not callable(build):
+            raise TypeError('build must be callable')
+        if processes is not None and (not isinstance(processes, int) or processes < 1):
+            raise ValueError('processes must be a positive int')
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError('chunk_size must be a positive int')
+        if max_pending is not None and (not isinstance(max_pending, int) or max_pending < 1):
+            raise ValueError('max_pending must be a positive int')
+        if dispatcher is not None and not isinstance(dispatcher, Dispatcher):
+            raise TypeError('dispatcher must be Dispatcher')
+
+        self.build = build
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending or 4 * self.processes
+        self.hook_url = hook_url
+
+        self._own_dispatcher = dispatcher is None
+        if dispatcher is None:
+            transport = transport if transport is not None else Transport(pool_maxsize=senders)
+            dispatcher = Dispatcher(transport, workers=senders)
+        self.dispatcher = dispatcher
+
+        # imported here, since it imports multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        self._executor = ProcessPoolExecutor(self.processes, initializer=_init_worker, initargs=(build,))
+
+    def payloads(self, records) -> iter:
+        """Build and serialize the messages of a stream of records in the worker processes
+
+        Args:
+            records: An iterable (or generator) of picklable records.
+
+        Yields:
+            (str, str): The url of the next hook (None if it has none) and its json, in the order of the records.
+
+        Raises:
+            ValueError: If build failed on a record; the message tells the index of the record.
+        """
+        pending = deque()
+        chunk, start = [], 0
+        try:
+            for record in records:
+                chunk.append(record)
+                if len(chunk) < self.chunk_size:
+                    continue
+                pending.append(self._executor.submit(_build_chunk, start, chunk))
+                start += len(chunk)
+                chunk = []
+                if len(pending) >= self.max_pending:
+                    yield from pending.popleft().result()
+            if chunk:
+                pending.append(self._executor.submit(_build_chunk, start, chunk))
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # the chunks nobody will read, when the caller stopped early or a record failed
+            for future in pending:
+                future.cancel()
+
+    def send(self, records, hook_url: str = None, priority: str = Dispatcher.LOW) -> dict:
+        """Build the messages of a stream of records in the worker processes, send them and wait for them
+
+        Args:
+            records: An iterable (or generator) of picklable records.
+            hook_url (str): The url of the hooks that have no url of their own, instead of the pipeline's url.
+            priority (str): The lane of the dispatcher the messages are sent in. LOW, so the messages
+                of a shared dispatcher that matter more are not stuck behind the bulk of the pipeline.
+
+        Returns:
+            dict: The number of messages that were sent, and that failed (the failures are logged).
+        """
+        hook_url = hook_url or self.hook_url
+        hook = Hook()
+        counts = {'sent': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def done(future):
+            # called on the dispatcher's threads
+            error = future.exception()
+            ok = error is None and 200 <= future.result().status_code <= 299
+            with lock:
+                counts['sent' if ok else 'failed'] += 1
+            if ok:
+                return
+            logger.error('Error while sending a message of the pipeline: %s', error or future.result().status_code)
+
+        for url, json_obj in self.payloads(records):
+            url = url or hook_url
+            if not url:
+                raise AttributeError('hook_url is not set')
+            self.dispatcher.submit(hook, url, json_obj, priority=priority).add_done_callback(done)
+        self.dispatcher.flush()
+        return counts
+
+    def close(self):
+        """Stop the worker processes, and close the dispatcher if the pipeline created it"""
+        self._executor.shutdown()
+        if self._own_dispatcher:
+            self.dispatcher.close()
+            if self.dispatcher.transport is not None:
+                self.dispatcher.transport.close()
+
+    def __enter__(self) -> 'ProcessPipeline':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
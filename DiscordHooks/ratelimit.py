@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+from collections import deque
+import time
+from urllib.parse import urlsplit
+
+
+class _Bucket:
+    """The rate limit state of a single webhook url"""
+    __slots__ = ('limit', 'window', 'sends', 'blocked_until', 'name', 'known')
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        # the times of the last `limit` sends that were reserved
+        self.sends = deque(maxlen=limit)
+        self.blocked_until = 0.0
+        self.name = None
+        # False until the server told us the real limits of the bucket
+        self.known = False
+
+
+class RateLimiter:
+    """Discord rate limit engine
+
+    Tracks the rate limit bucket of every webhook url from the X-RateLimit-* headers of its responses,
+    together with the global rate limit, and tells the transport how long to wait before each send,
+    so that sends don't hit 429 in the first place.
+
+    Every send reserves the next free slot of its bucket, so concurrent sends to the same webhook go out
+    in the order they were reserved, each one as early as the bucket allows: no more than the bucket's
+    limit of sends are scheduled in any window of the bucket's length.
+    Sends that are still throttled by Discord are retried after the retry_after it answered.
+    Until the first response of a webhook arrives, its bucket is assumed to be Discord's usual
+    webhook limit (DEFAULT_BUCKET_LIMIT sends per DEFAULT_BUCKET_WINDOW seconds).
+
+    The limiter is thread-safe, and it never blocks by itself; the transports do the waiting.
+
+    Attributes:
+        global_limit (int): The maximum number of sends per global_period, for all the webhooks together.
+            None for no global limit.
+        global_period (float): The period of the global limit in seconds.
+        max_retries (int): How many times a throttled send is retried before giving up.
+    """
+    DEFAULT_BUCKET_LIMIT = 5
+    DEFAULT_BUCKET_WINDOW = 2.0
+    # extra seconds between windows, for the jitter in the time it takes a request to reach Discord
+    SAFETY_MARGIN = 0.05
+
+    def __init__(self, global_limit: int = 50, global_period: float = 1.0, max_retries: int = 5):
+        """Initiate the RateLimiter object
+
+        Args:
+            global_limit (int): The maximum number of sends per global_period. None for no global limit.
+            global_period (float): The period of the global limit in seconds.
+            max_retries (int): How many times a throttled send is retried before giving up.
+        """
+        if global_limit is not None and (not isinstance(global_limit, int) or global_limit < 1):
+            raise ValueError('global_limit must be a positive int')
+        if global_period <= 0:
+            raise ValueError('global_period must be positive')
+        if not isinstance(max_retries, int) or max_retries < 0:
+            raise ValueError('max_retries must be a non negative int')
+
+        self.global_limit = global_limit
+        self.global_period = global_period
+        self.max_retries = max_retries
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+        # theoretical arrival time of the next send (GCRA), and the end of a global 429
+        self._global_tat = 0.0
+        self._global_blocked_until = 0.0
+
+    @staticmethod
+    def bucket_key(url: str) -> str:
+        """Get the key of the bucket a url belongs to
+
+        Args:
+            url (str): The webhook url.
+
+        Returns:
+            str: The url without its query string and fragment. The edits and deletes of all the messages
+                of a webhook share one bucket, so the message id is left out of their key.
+        """
+        parts = urlsplit(url)
+        path = parts.path.rstrip('/')
+        head, sep, _ = path.rpartition('/messages/')
+        if sep:
+            path = head + '/messages'
+        return '{}://{}{}'.format(parts.scheme, parts.netloc, path)
+
+    def reserve(self, url: str) -> float:
+        """Reserve the next free slot for a send to url
+
+        Args:
+            url (str): The webhook url the send goes to.
+
+        Returns:
+            float: The number of seconds to wait before sending.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(url)
+            send_at = self._send_at(bucket, now)
+            if self.global_limit is not None:
+                self._global_tat = max(self._global_tat, send_at) + self.global_period / self.global_limit
+            bucket.sends.append(send_at)
+
+        return send_at - now
+
+    def delay(self, url: str) -> float:
+        """Get how long a send to url would wait, without reserving a slot
+
+        Args:
+            url (str): The webhook url.
+
+        Returns:
+            float: The number of seconds until the next free slot of the url's bucket. 0 if it is free now.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(self.bucket_key(url))
+            if bucket is None:
+                bucket = _Bucket(self.DEFAULT_BUCKET_LIMIT, self.DEFAULT_BUCKET_WINDOW)
+            return self._send_at(bucket, now) - now
+
+    def _send_at(self, bucket: _Bucket, now: float) -> float:
+        send_at = max(now, self._global_blocked_until, bucket.blocked_until)
+
+        if len(bucket.sends) == bucket.limit:
+            send_at = max(send_at, bucket.sends[0] + bucket.window + self.SAFETY_MARGIN)
+
+        if self.global_limit is not None:
+            interval = self.global_period / self.global_limit
+            tolerance = self.global_period - interval
+            send_at = max(send_at, self._global_tat - tolerance)
+        return send_at
+
+    def update(self, url: str, response) -> float:
+        """Update the state of url's bucket from the response of a send
+
+        Args:
+            url (str): The webhook url the send went to.
+            response: The response of the send (requests.Response or AsyncResponse).
+
+        Returns:
+            float: The retry_after of the send if it was throttled, else None.
+                The next reserve of the bucket already waits for it.
+        """
+        headers = response.headers
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(url)
+
+            limit = _to_number(headers.get('X-RateLimit-Limit'), int)
+            remaining = _to_number(headers.get('X-RateLimit-Remaining'), int)
+            reset_after = _to_number(headers.get('X-RateLimit-Reset-After'), float)
+            bucket.name = headers.get('X-RateLimit-Bucket', bucket.name)
+
+            if limit is not None and limit > 0 and reset_after is not None:
+                if limit != bucket.limit:
+                    bucket.limit = limit
+                    bucket.sends = deque(bucket.sends, maxlen=limit)
+                bucket.window = max(bucket.window, reset_after) if bucket.known else reset_after
+                bucket.known = True
+                if remaining == 0:
+                    # the server's window is used up, maybe by someone else sending to the webhook
+                    bucket.blocked_until = max(bucket.blocked_until, now + reset_after)
+
+            if response.status_code != 429:
+                return None
+
+            retry_after = self._retry_after(response)
+            if headers.get('X-RateLimit-Global', '').lower() == 'true' or self._is_global(response):
+                self._global_blocked_until = max(self._global_blocked_until, now + retry_after)
+            else:
+                bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+            return retry_after
+
+    def _bucket(self, url: str) -> _Bucket:
+        key = self.bucket_key(url)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(self.DEFAULT_BUCKET_LIMIT, self.DEFAULT_BUCKET_WINDOW)
+        return bucket
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        retry_after = _to_number(_body(response).get('retry_after'), float)
+        if retry_after is None:
+            retry_after = _to_number(response.headers.get('Retry-After'), float)
+        if retry_after is None:
+            retry_after = _to_number(response.headers.get('X-RateLimit-Reset-After'), float)
+        return retry_after if retry_after is not None else 1.0
+
+    @staticmethod
+    def _is_global(response) -> bool:
+        return _body(response).get('global') is True
+
+
+def _to_number(value, kind):
+    if value is None:
+        return None
+    try:
+        return kind(value)
+    except ValueError:
+        return None
+
+
+def _body(response) -> dict:
+    try:
+        body = json.loads(response.content)
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+import json
+import random
+import threading
+import time
+
+from .embed import Embed, EmbedField, MAX_EMBEDS_LENGTH, datetime, _NESTED_TYPES
+from .hook import Hook, _add_query, _buffer
+from .metrics import SendEvent
+from .transport import Transport, default_transport
+
+
+class RawSender:
+    """Sending of payloads that are already encoded, as they are
+
+    For trusted producers that already hold the utf-8 json of their messages, or complete multipart bodies:
+    the payloads are handed to the pooled connections of the transport without being decoded, re-encoded
+    or validated, and bytearray and memoryview payloads are not even copied.
+
+    Since nothing checks a raw payload, a fraction `validate` of them is parsed and checked against
+    the models before it is sent, so a producer that starts sending broken payloads is noticed
+    without paying for the validation of every message. A sampled payload that is invalid raises
+    ValueError and is not sent.
+
+    Example:
+        sender = RawSender(hook_url=webhook, validate=0.01)
+        for payload in upstream:  # utf-8 json bytes
+            sender.send(payload)
+
+    Attributes:
+        hook_url (str): The url the payloads are sent to when no url is given.
+        transport (Transport): The transport the payloads are sent with. The shared default transport when not set.
+        validate (float): The fraction of the payloads that is validated, between 0 (none) and 1 (all).
+        validated (int): The number of payloads that were validated.
+        invalid (int): The number of validated payloads that were invalid.
+    """
+
+    def __init__(self, hook_url: str = None, transport: Transport = None, validate: float = 0.0, seed: int = None):
+        """Initiate the RawSender object
+
+        Args:
+            hook_url (str): The url the payloads are sent to when no url is given.
+            transport (Transport): The transport to send with.
+            validate (float): The fraction of the payloads to validate, between 0 (none) and 1 (all).
+            seed (int): The seed of the sampling, for reproducible runs.
+        """
+        if transport is not None and not isinstance(transport, Transport):
+            raise TypeError('transport must be Transport')
+        if not 0 <= validate <= 1:
+            raise ValueError('validate must be between 0 and 1')
+
+        self.hook_url = hook_url
+        self.transport = transport
+        self.validate = validate
+        self.validated = 0
+        self.invalid = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send(self, payload, hook_url: str = None, content_type: str = 'application/json', wait: bool = False,
+             event: SendEvent = None):
+        """Send a payload as it is
+
+        Args:
+            payload (bytes, bytearray or memoryview): The utf-8 json of the message, or a complete multipart body.
+            hook_url (str): The url to send to, instead of the sender's url.
+            content_type (str): The Content-Type of the payload, with the boundary of a multipart body.
+            wait (bool): True to wait for the message to be created, and get it in the response.
+            event (SendEvent): The measurements of the send so far, for the transport's instrumentation.
+
+        Returns:
+            requests.Response: The response of the server.
+
+        Raises:
+            ValueError: If the payload was sampled for validation and is invalid.
+        """
+        transport = self.transport or default_transport()
+        started = time.perf_counter()
+        hook_url, data, headers = self._prepare(payload, hook_url, content_type, wait)
+        if transport.instrumentation is not None:
+            event = event or SendEvent()
+            event.serialize_time += time.perf_counter() - started
+
+        result = transport.post(hook_url, data=data, headers=headers, event=event)
+        Hook._log_result(result)
+
+        return result
+
+    async def send_async(self, payload, hook_url: str = None, content_type: str = 'application/json',
+                         wait: bool = False, transport: 'AsyncTransport' = None, event: SendEvent = None):
+        """Send a payload as it is without blocking the event loop
+
+        Note:
+            Requires aiohttp (pip install DiscordHooks[async]).
+            The arguments are the same as in send.
+
+        Args:
+            payload (bytes, bytearray or memoryview): The utf-8 json of the message, or a complete multipart body.
+            hook_url (str): The url to send to, instead of the sender's url.
+            content_type (str): The Content-Type of the payload, with the boundary of a multipart body.
+            wait (bool): True to wait for the message to be created, and get it in the response.
+            transport (AsyncTransport): The transport to send with. The running loop's default transport when not set.
+            event (SendEvent): The measurements of the send so far, for the transport's instrumentation.
+
+        Returns:
+            AsyncResponse: The response of the server.
+        """
+        if transport is None:
+            from .async_transport import default_async_transport
+            transport = default_async_transport()
+
+        started = time.perf_counter()
+        hook_url, data, headers = self._prepare(payload, hook_url, content_type, wait)
+        if transport.instrumentation is not None:
+            event = event or SendEvent()
+            event.serialize_time += time.perf_counter() - started
+
+        result = await transport.post(hook_url, data=data, headers=headers, event=event)
+        Hook._log_result(result)
+
+        return result
+
+    def check(self, payload, content_type: str = 'application/json'):
+        """Validate a payload against the models, whether it is sampled or not
+
+        Args:
+            payload (bytes, bytearray or memoryview): The utf-8 json of the message, or a complete multipart body.
+            content_type (str): The Content-Type of the payload.
+
+        Raises:
+            ValueError: If the payload is invalid.
+        """
+        with self._lock:
+            self.validated += 1
+        try:
+            _check(*_parse(content_type, bytes(payload)))
+        except (TypeError, ValueError) as e:
+            with self._lock:
+                self.invalid += 1
+            raise ValueError('invalid payload: {}'.format(e)) from e
+
+    def _prepare(self, payload, hook_url: str, content_type: str, wait: bool) -> (str, object, dict):
+        hook_url = hook_url or self.hook_url
+        if not hook_url:
+            raise AttributeError('hook_url is not set')
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            raise TypeError('payload must be bytes, bytearray or memoryview')
+        data = _buffer(payload)
+        if self.validate and (self.validate >= 1 or self._random.random() < self.validate):
+            self.check(data, content_type)
+        if wait:
+            hook_url = _add_query(hook_url, 'wait=true')
+        return hook_url, data, {'Content-Type': content_type}
+
+
+def _parse(content_type: str, body: bytes) -> (dict, int):
+    """Get the json payload of a body, and the number of files attached to it"""
+    if content_type.startswith('application/json'):
+        return json.loads(body), 0
+
+    if content_type.startswith('multipart/form-data'):
+        # imported here, since only the sampled multipart bodies need them
+        import email.parser
+        import email.policy
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+        if not message.is_multipart():
+            raise ValueError('the multipart body has no parts')
+        payload, files = None, 0
+        for part in message.iter_parts():
+            if part.get_param('name', header='content-disposition') == 'payload_json':
+                payload = json.loads(part.get_payload(decode=True))
+            elif part.get_filename() is not None:
+                files += 1
+        if payload is None:
+            raise ValueError('the multipart body has no payload_json')
+        return payload, files
+
+    raise ValueError('unsupported Content-Type {!r}'.format(content_type))
+
+
+def _check(payload: dict, files: int):
+    """Build the models of a payload, which raise on invalid items, and check the limits of a message"""
+    if not isinstance(payload, dict):
+        raise TypeError('the payload must be a json object')
+    embeds = payload.get('embeds') or []
+    if not isinstance(embeds, list):
+        raise TypeError('embeds must be list')
+
+    hook = Hook(content=payload.get('content'), username=payload.get('username'),
+                avatar_url=payload.get('avatar_url'), tts=payload.get('tts') or False,
+                embeds=[_embed(embed) for embed in embeds])
+    if hook.length > MAX_EMBEDS_LENGTH:
+        raise ValueError('embeds length must be up to {} characters'.format(MAX_EMBEDS_LENGTH))
+    if not (hook.content or hook.embeds or files):
+        raise ValueError('the payload is empty')
+
+
+def _embed(obj: dict) -> Embed:
+    obj = _known(obj, Embed, 'embeds items')
+    if isinstance(obj.get('timestamp'), str):
+        obj['timestamp'] = datetime.fromisoformat(obj['timestamp'].replace('Z', '+00:00'))
+    for key, cls in _NESTED_TYPES:
+        if obj.get(key) is not None:
+            obj[key] = _known(obj[key], cls, key)
+    fields = obj.get('fields')
+    if isinstance(fields, list):
+        obj['fields'] = [_known(field, EmbedField, 'fields items') for field in fields]
+    return Embed.from_dict(obj)
+
+
+def _known(obj: dict, cls: type, name: str) -> dict:
+    """Get the items of a json object that the model knows
+
+    The items the models don't know (e.g. type, inline, width, proxy_icon_url) are Discord's business,
+    not errors of the payload.
+    """
+    if not isinstance(obj, dict):
+        raise TypeError('{} must be dict'.format(name))
+    return {key: value for key, value in obj.items() if key in cls.__items__}
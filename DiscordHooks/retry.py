@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import random
+import time
+
+
+class Attempt:
+    """The report of one attempt to send a request
+
+    Attributes:
+        url (str): The url the request was sent to.
+        number (int): The number of the attempt, starting from 1.
+        response: The response of the server, None if the request failed.
+        exception (Exception): The error of the request, None if the server answered.
+        elapsed (float): The number of seconds since the first attempt started.
+        delay (float): The number of seconds until the next attempt, None if there is no next attempt.
+    """
+    __slots__ = ('url', 'number', 'response', 'exception', 'elapsed', 'delay')
+
+    def __init__(self, url: str, number: int, response, exception: Exception, elapsed: float, delay: float):
+        self.url = url
+        self.number = number
+        self.response = response
+        self.exception = exception
+        self.elapsed = elapsed
+        self.delay = delay
+
+    @property
+    def will_retry(self) -> bool:
+        """bool: True if the request is sent again after this attempt."""
+        return self.delay is not None
+
+    def __repr__(self):
+        result = self.exception if self.response is None else self.response.status_code
+        return '<Attempt {} of {}: {}>'.format(self.number, self.url, result)
+
+
+class RetryPolicy:
+    """The timeouts and retries of the requests sent by a transport
+
+    A request is retried when it fails with a connection error or a timeout, or when the server answers
+    with one of the retryable status codes. Retries wait an exponentially growing backoff, with full jitter:
+    a random time between 0 and min(max_backoff, backoff * 2 ** (attempt - 1)) seconds.
+
+    Note:
+        429 responses are not retried by the policy; the transport's RateLimiter retries them.
+        They are still reported to on_attempt, don't count towards max_attempts,
+        and the deadline bounds the time waited for the rate limit.
+        A request that timed out while reading the response may have been delivered,
+        so retrying it may post the message twice.
+
+    Attributes:
+        max_attempts (int): The maximum number of attempts of a request, including the first one.
+        connect_timeout (float): The number of seconds to wait for a connection. None for no timeout.
+        read_timeout (float): The number of seconds to wait for the server to answer. None for no timeout.
+        backoff (float): The base of the exponential backoff in seconds.
+        max_backoff (float): The maximum backoff in seconds.
+        jitter (bool): False to wait the full backoff instead of a random part of it.
+        retry_statuses (set): The status codes that are retried.
+        deadline (float): The maximum number of seconds from the first attempt to the start of the last one,
+            including the time waited for the rate limit. None for no deadline.
+        on_attempt (callable): Called with an Attempt after every attempt.
+    """
+
+    def __init__(self, max_attempts: int = 3, connect_timeout: float = 5.0, read_timeout: float = 30.0,
+                 backoff: float = 0.5, max_backoff: float = 30.0, jitter: bool = True,
+                 retry_statuses: set = frozenset((500, 502, 503, 504)), deadline: float = None,
+                 on_attempt: callable = None):
+        """Initiate the RetryPolicy object
+
+        Args:
+            max_attempts (int): The maximum number of attempts of a request, including the first one.
+            connect_timeout (float): The number of seconds to wait for a connection. None for no timeout.
+            read_timeout (float): The number of seconds to wait for the server to answer. None for no timeout.
+            backoff (float): The base of the exponential backoff in seconds.
+            max_backoff (float): The maximum backoff in seconds.
+            jitter (bool): False to wait the full backoff instead of a random part of it.
+            retry_statuses (set): The status codes that are retried.
+            deadline (float): The maximum number of seconds from the first attempt to the start of the last one.
+            on_attempt (callable): Called with an Attempt after every attempt.
+        """
+        if not isinstance(max_attempts, int) or max_attempts < 1:
+            raise ValueError('max_attempts must be a positive int')
+        if backoff < 0 or max_backoff < 0:
+            raise ValueError('backoff and max_backoff must be non negative')
+        if on_attempt is not None and not callable(on_attempt):
+            raise TypeError('on_attempt must be callable')
+
+        self.max_attempts = max_attempts
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.deadline = deadline
+        self.on_attempt = on_attempt
+
+    def backoff_delay(self, number: int) -> float:
+        """Get the time to wait after a failed attempt
+
+        Args:
+            number (int): The number of the failed attempt, starting from 1.
+
+        Returns:
+            float: The number of seconds to wait before the next attempt.
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** (number - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def is_retryable(self, response=None, exception: Exception = None) -> bool:
+        """Check if the result of an attempt should be retried
+
+        Args:
+            response: The response of the server, None if the request failed.
+            exception (Exception): The connection error or timeout of the request.
+
+        Returns:
+            bool: True if the request should be sent again.
+        """
+        if exception is not None:
+            return True
+        return response is not None and response.status_code in self.retry_statuses
+
+    def start(self, url: str, rate_limiter: 'RateLimiter' = None) -> '_Attempts':
+        """Start tracking the attempts of a request
+
+        Args:
+            url (str): The url the request is sent to.
+            rate_limiter (RateLimiter): The rate limiter the request waits for, so the deadline bounds its waits.
+
+        Returns:
+            _Attempts: Tells after each attempt how long to wait before the next one.
+        """
+        return _Attempts(self, url, rate_limiter)
+
+
+class _Attempts:
+    """The attempts of one request under a RetryPolicy"""
+    __slots__ = ('policy', 'url', 'rate_limiter', 'number', 'throttled', 'started')
+
+    def __init__(self, policy: RetryPolicy, url: str, rate_limiter: 'RateLimiter' = None):
+        self.policy = policy
+        self.url = url
+        self.rate_limiter = rate_limiter
+        self.number = 0
+        self.throttled = 0
+        self.started = time.monotonic()
+
+    def next_delay(self, response=None, exception: Exception = None) -> float:
+        """Report an attempt, and get the time to wait before the next one
+
+        Args:
+            response: The response of the server, None if the request failed.
+            exception (Exception): The connection error or timeout of the request.
+
+        Returns:
+            float: The number of seconds to wait before the next attempt, None if the request shouldn't be retried.
+        """
+        policy = self.policy
+        self.number += 1
+        elapsed = time.monotonic() - self.started
+        failures = self.number - self.throttled
+
+        delay = None
+        if failures < policy.max_attempts and policy.is_retryable(response, exception):
+            delay = policy.backoff_delay(failures)
+            if not self._in_time(elapsed, delay):
+                delay = None
+
+        if policy.on_attempt is not None:
+            policy.on_attempt(Attempt(self.url, self.number, response, exception, elapsed, delay))
+        return delay
+
+    def throttle(self, response, retry: bool = True) -> float:
+        """Report an attempt that was throttled, which the rate limiter retries
+
+        Args:
+            response: The 429 response of the server.
+            retry (bool): False if the rate limiter gives up on the request.
+
+        Returns:
+            float: The number of seconds the rate limit makes the next attempt wait,
+                None if the request shouldn't be retried.
+        """
+        self.number += 1
+        self.throttled += 1
+        elapsed = time.monotonic() - self.started
+
+        delay = None
+        if retry:
+            delay = self.rate_limiter.delay(self.url) if self.rate_limiter is not None else 0.0
+            if not self._in_time(elapsed, delay):
+                delay = None
+
+        if self.policy.on_attempt is not None:
+            self.policy.on_attempt(Attempt(self.url, self.number, response, None, elapsed, delay))
+        return delay
+
+    def _in_time(self, elapsed: float, delay: float) -> bool:
+        """Check if the next attempt, after delay and the wait for the rate limit, starts before the deadline"""
+        deadline = self.policy.deadline
+        if deadline is None:
+            return True
+        if self.rate_limiter is not None:
+            delay = max(delay, self.rate_limiter.delay(self.url))
+        return elapsed + delay <= deadline
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Fast serialization of the webhook models
+
+Every model class (a class with __items__) gets an encoder function that is generated once, from the
+layout of its __items__ and the return annotations of their properties. The encoder reads the values
+straight from the attributes the properties store them in, and encodes nested models by calling their
+own encoders directly, so the whole payload is built in a single pass with no per-value type dispatch.
+
+The payload is dumped with orjson or ujson when one of them is installed, and with the json module otherwise.
+"""
+import json
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional dependency
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover - ujson is an optional dependency
+    ujson = None
+
+if orjson is not None:
+    BACKEND = 'orjson'
+
+    def dumps(obj) -> str:
+        """Dump a json compatible object to a compact json string
+
+        Args:
+            obj: The object to dump.
+
+        Returns:
+            str: The json string.
+        """
+        return orjson.dumps(obj).decode('utf-8')
+elif ujson is not None:
+    BACKEND = 'ujson'
+
+    def dumps(obj) -> str:
+        """Dump a json compatible object to a compact json string
+
+        Args:
+            obj: The object to dump.
+
+        Returns:
+            str: The json string.
+        """
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False)
+else:
+    BACKEND = 'json'
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def dumps(obj) -> str:
+        """Dump a json compatible object to a compact json string
+
+        Args:
+            obj: The object to dump.
+
+        Returns:
+            str: The json string.
+        """
+        return _encoder.encode(obj)
+
+
+_encoders = {}
+_compiling = set()
+
+
+def encoder_for(cls) -> callable:
+    """Get the encoder of a model class
+
+    The encoder is generated on the first call for the class, and reused after that.
+
+    Args:
+        cls (type): A class with __items__.
+
+    Returns:
+        callable: A function that takes an instance of cls and returns it encoded to json types.
+    """
+    encoder = _encoders.get(cls)
+    if encoder is None:
+        encoder = _encoders[cls] = _compile(cls)
+    return encoder
+
+
+def register_encoder(cls, encoder: callable):
+    """Set the encoder of a model class, instead of generating one
+
+    Args:
+        cls (type): A class with __items__.
+        encoder (callable): A function that takes an instance of cls and returns it encoded to json types.
+    """
+    _encoders[cls] = encoder
+
+
+def encode_value(value):
+    """Encode any value of a model to json types
+
+    This is the generic (slow) path, for values the generated encoders didn't expect.
+
+    Args:
+        value: The value to encode.
+
+    Returns:
+        The encoded value.
+    """
+    if hasattr(value, '__items__'):
+        encoded = getattr(value, '_encoded', None)
+        return encoded() if encoded is not None else encoder_for(type(value))(value)
+    elif isinstance(value, datetime):
+        return value.isoformat()
+    elif isinstance(value, (list, tuple)):
+        return [encode_value(item) for item in value]
+    elif isinstance(value, dict):
+        return {key: encode_value(item) for key, item in value.items()}
+    return value
+
+
+def _compile(cls) -> callable:
+    _compiling.add(cls)
+    try:
+        return _generate(cls)
+    finally:
+        _compiling.discard(cls)
+
+
+def _generate(cls) -> callable:
+    namespace = {'encode_value': encode_value, 'datetime': datetime}
+    lines = ['def encode(obj):', '    d = {}']
+
+    for index, key in enumerate(cls.__items__):
+        prop = getattr(cls, key, None)
+        if isinstance(prop, property) and prop.fget.__module__.startswith(__package__ + '.'):
+            # the models of the package keep the value of each property in the attribute `_<name>`
+            lines.append('    v = obj._{}'.format(key))
+        else:
+            lines.append('    v = obj.{}'.format(key))
+        lines.append('    if v is not None:')
+
+        kind = prop.fget.__annotations__.get('return') if isinstance(prop, property) else None
+        if isinstance(kind, list) and len(kind) == 1 and _is_model(kind[0]):
+            namespace['cls_{}'.format(index)] = kind[0]
+            lines.append('        d[{!r}] = [{} if type(x) is cls_{i} else encode_value(x) for x in v]'
+                         .format(key, _nested(namespace, kind[0], 'x', index), i=index))
+        elif _is_model(kind):
+            namespace['cls_{}'.format(index)] = kind
+            lines.append('        d[{!r}] = {} if type(v) is cls_{i} else encode_value(v)'
+                         .format(key, _nested(namespace, kind, 'v', index), i=index))
+        elif kind is datetime:
+            lines.append('        d[{!r}] = v.isoformat()'.format(key))
+        elif kind in (str, int, bool, float):
+            lines.append('        d[{!r}] = v'.format(key))
+        else:
+            lines.append('        d[{!r}] = encode_value(v)'.format(key))
+
+    lines.append('    return d')
+    exec(compile('\n'.join(lines), '<encoder of {}>'.format(cls.__qualname__), 'exec'), namespace)
+    return namespace['encode']
+
+
+def _nested(namespace: dict, kind: type, name: str, index: int) -> str:
+    # the nested models that cache their encoding (the BaseSerializable ones) are encoded through the cache,
+    # so a nested object that didn't change (or is shared by several parents) is not encoded again
+    if hasattr(kind, '_encoded'):
+        return '{}._encoded()'.format(name)
+    namespace['enc_{}'.format(index)] = encoder_for(kind)
+    return 'enc_{}({})'.format(index, name)
+
+
+def _is_model(kind) -> bool:
+    # a model that is being compiled can't be called directly by itself, it goes through encode_value
+    return isinstance(kind, type) and hasattr(kind, '__items__') and kind not in _compiling
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+from .embed import Embed, EmbedField, MAX_EMBEDS_LENGTH, MAX_FIELDS, MAX_FIELD_VALUE_LENGTH
+from .hook import Hook
+
+MAX_CONTENT_LENGTH = 2000
+MAX_EMBEDS = 10
+
+FENCE = '```'
+
+
+def split_text(text: str, limit: int = MAX_CONTENT_LENGTH) -> [str]:
+    """Split a text to chunks of up to `limit` characters
+
+    The text is split between lines, and a line is split only if it is longer than a whole chunk
+    (at its last space that fits, if there is one). A code block that is split is closed at the end
+    of its chunk and opened again, with the same language, at the start of the next chunk.
+    Chunks are filled greedily, so the text is split to as few chunks as the rules allow,
+    in time linear in the length of the text.
+
+    Args:
+        text (str): The text to split.
+        limit (int): The maximum length of a chunk.
+
+    Returns:
+        [str]: The chunks, without blank ones.
+    """
+    if not isinstance(text, str):
+        raise TypeError('text must be string')
+    if not isinstance(limit, int) or limit < 1:
+        raise ValueError('limit must be a positive int')
+    if len(text) <= limit:
+        return [text] if text.strip() else []
+    return _TextSplitter(limit).split(text)
+
+
+class _TextSplitter:
+    """Greedy line packer that keeps code blocks valid across chunks"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.chunks = []
+        self.lines = []
+        # the length of '\n'.join(self.lines), -1 when there are no lines, so adding a line always costs 1 + len
+        self.size = -1
+        # the opening line of the code block the current line is in, None when outside of a code block
+        self.fence = None
+
+    def split(self, text: str) -> [str]:
+        for line in text.split('\n'):
+            self.add(line)
+        self.flush(reopen=False)
+        return self.chunks
+
+    def add(self, line: str):
+        fence = self.toggle(line)
+        if self.fits(line, fence):
+            self.append(line, fence)
+            return
+
+        if self.lines and self.lines != [self.fence]:
+            self.flush()
+            if self.fits(line, fence):
+                self.append(line, fence)
+                return
+
+        # the line is longer than a whole chunk; only the chunks are copied out of it, not the rest of the line
+        start = 0
+        while self.size + 1 + len(line) - start + self.reserve(fence) > self.limit:
+            room = self.limit - (self.size + 1) - self.reserve(self.fence)
+            if room <= 0:
+                self.flush()
+                continue
+            cut = line.rfind(' ', start + room // 2, start + room + 1)
+            if cut <= start:
+                cut = start + room
+            self.append(line[start:cut], self.fence)
+            start = cut
+            while start < len(line) and line[start] == ' ':
+                start += 1
+            self.flush()
+        self.append(line[start:], fence)
+
+    def fits(self, line: str, fence: str) -> bool:
+        return self.size + 1 + len(line) + self.reserve(fence) <= self.limit
+
+    def reserve(self, fence: str) -> int:
+        # the room that is kept for closing the code block at the end of the chunk
+        return len(FENCE) + 1 if fence is not None else 0
+
+    def append(self, line: str, fence: str):
+        self.lines.append(line)
+        self.size += 1 + len(line)
+        self.fence = fence
+
+    def toggle(self, line: str):
+        stripped = line.strip()
+        if not stripped.startswith(FENCE) or stripped.count(FENCE) % 2 == 0:
+            return self.fence
+        if self.fence is not None:
+            return None
+        # reopening the block in the next chunk must leave room for the lines of the block
+        return stripped if len(stripped) + 2 * (len(FENCE) + 1) < self.limit else None
+
+    def flush(self, reopen: bool = True):
+        if self.fence is not None:
+            self.lines.append(FENCE)
+        chunk = '\n'.join(self.lines)
+        if chunk.strip() and chunk.strip() != (self.fence or '') + '\n' + FENCE:
+            self.chunks.append(chunk)
+        if reopen and self.fence is not None:
+            self.lines = [self.fence]
+            self.size = len(self.fence)
+        else:
+            self.lines = []
+            self.size = -1
+
+
+def split_fields(fields: list, template: Embed = None) -> [Embed]:
+    """Split fields to as few embeds as possible
+
+    Every embed is a copy of the template with up to 25 of the fields, and up to 6000 characters.
+    A value that is longer than 1024 characters is split with split_text to several fields with the same name.
+
+    Args:
+        fields (list): EmbedField objects, or (name, value) pairs with values of any length.
+        template (Embed): The embed the fields are added to (its own fields are kept first).
+            An empty embed when not set.
+
+    Returns:
+        [Embed]: The embeds, in the order of the fields.
+    """
+    if template is not None and not isinstance(template, Embed):
+        raise TypeError('template must be Embed')
+    template = template or Embed()
+    base_fields = list(template.fields)
+    base_length = template.length
+
+    embeds = []
+    current, length = list(base_fields), base_length
+    for field in _expand_fields(fields):
+        field_length = len(field.name or '') + len(field.value or '')
+        full = len(current) >= MAX_FIELDS or length + field_length > MAX_EMBEDS_LENGTH
+        if full and len(current) > len(base_fields):
+            embeds.append(_copy(template, current))
+            current, length = list(base_fields), base_length
+        current.append(field)
+        length += field_length
+    if len(current) > len(base_fields) or not embeds:
+        embeds.append(_copy(template, current))
+    return embeds
+
+
+def split_hook(content: str = None, fields: list = None, template: Embed = None, embeds: [Embed] = None,
+               **kwargs) -> [Hook]:
+    """Split a message of any size to as few valid hooks as possible
+
+    The content is split with split_text, the fields with split_fields, and the embeds (the given ones
+    followed by those of the fields) are packed in order, up to 10 embeds and 6000 embed characters
+    per hook. The embeds go with the last chunks of the content, so they show up after the text.
+
+    Args:
+        content (str): The message contents, of any length.
+        fields (list): EmbedField objects, or (name, value) pairs with values of any length.
+        template (Embed): The embed the fields are added to.
+        embeds ([Embed]): Embeds sent before the embeds of the fields.
+        **kwargs: The other arguments of every Hook (hook_url, username, avatar_url, tts, transport).
+
+    Returns:
+        [Hook]: The hooks, in the order they should be sent.
+    """
+    chunks = split_text(content) if content else []
+    all_embeds = list(embeds or [])
+    if fields:
+        all_embeds.extend(split_fields(fields, template))
+
+    groups = []
+    length = 0
+    for embed in all_embeds:
+        size = embed.length
+        if size > MAX_EMBEDS_LENGTH:
+            raise ValueError('embed length must be up to {} characters'.format(MAX_EMBEDS_LENGTH))
+        if not groups or len(groups[-1]) >= MAX_EMBEDS or length + size > MAX_EMBEDS_LENGTH:
+            groups.append([])
+            length = 0
+        groups[-1].append(embed)
+        length += size
+
+    count = max(len(chunks), len(groups))
+    chunks = [None] * (count - len(chunks)) + chunks
+    groups = [None] * (count - len(groups)) + groups
+    return [Hook(content=chunk, embeds=group, **kwargs) for chunk, group in zip(chunks, groups)]
+
+
+def _expand_fields(fields: list):
+    for field in fields:
+        if isinstance(field, EmbedField):
+            yield field
+            continue
+        name, value = field
+        if value is None or len(value) <= MAX_FIELD_VALUE_LENGTH:
+            yield EmbedField(name=name, value=value)
+            continue
+        for chunk in split_text(value, MAX_FIELD_VALUE_LENGTH):
+            yield EmbedField(name=name, value=chunk)
+
+
+def _copy(template: Embed, fields: [EmbedField]) -> Embed:
+    return Embed(title=template.title, description=template.description, url=template.url,
+                 timestamp=template.timestamp, color=template.color, footer=template.footer, image=template.image,
+                 thumbnail=template.thumbnail, author=template.author, fields=fields)
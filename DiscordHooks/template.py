@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from .embed import Embed, EmbedField, MAX_FIELDS, MAX_FIELD_NAME_LENGTH, MAX_FIELD_VALUE_LENGTH, _versions
+from .serializer import encoder_for, encode_value, register_encoder
+
+
+class EmbedTemplate:
+    """Prototype of embeds that share most of their items
+
+    The invariant items (e.g. color, author, footer and thumbnail) are validated and serialized once,
+    when the template is created. Embeds stamped from the template copy them without running their
+    setters, only the items given to `stamp` are validated, and only those and the fields are encoded
+    when the embed is serialized; the rest of the json is copied from the template.
+
+    Note:
+        The stamped embeds share the nested objects (footer, author...) of the template,
+        so changing one of them changes every embed of the template.
+
+    Example:
+        template = EmbedTemplate(color=Color.Red, author=EmbedAuthor(name='monitor'),
+                                 footer=EmbedFooter(text='production'))
+        embed = template.stamp(description='disk is full', fields=[EmbedField(name='host', value=host)])
+    """
+
+    def __init__(self, **items):
+        """Initiate the EmbedTemplate object
+
+        Args:
+            **items: The invariant items of the embeds, as in Embed (title, color, author, footer...).
+        """
+        self._embed = Embed(**items)
+        # the private attributes of the items, copied into every stamped embed
+        self._values = tuple(('_' + key, getattr(self._embed, key)) for key in Embed.__items__)
+        self._embed._encoded()
+
+    @property
+    def embed(self) -> Embed:
+        """Embed: A copy of the template, as a plain Embed."""
+        return Embed(**{key: getattr(self._embed, key) for key in Embed.__items__})
+
+    def stamp(self, **overrides) -> Embed:
+        """Create an embed from the template
+
+        Args:
+            **overrides: The items that are different in this embed, as in Embed (description, fields...).
+                The fields replace the fields of the template, and may also be given as (name, value) pairs,
+                which are validated and created without going through the setters of EmbedField.
+
+        Returns:
+            Embed: The new embed.
+        """
+        fields = overrides.pop('fields', None)
+        embed = object.__new__(_StampedEmbed)
+        set_attr = object.__setattr__
+        for name, value in self._values:
+            set_attr(embed, name, value)
+        set_attr(embed, '_fields', list(self._embed._fields) if fields is None else _fields(fields))
+        set_attr(embed, '_template', self)
+        set_attr(embed, '_changed', ())
+        set_attr(embed, '_version', next(_versions))
+        for key, value in overrides.items():
+            if key not in Embed.__items__:
+                raise TypeError("stamp() got an unexpected item '{}'".format(key))
+            setattr(embed, key, value)
+        return embed
+
+
+def _fields(fields: list) -> [EmbedField]:
+    if not isinstance(fields, list):
+        raise TypeError('fields must be list')
+    if len(fields) > MAX_FIELDS:
+        raise ValueError('embed can contain up to {} field objects'.format(MAX_FIELDS))
+    result = []
+    set_attr = object.__setattr__
+    for field in fields:
+        if isinstance(field, tuple):
+            name, value = field
+            if not isinstance(name, str) or not isinstance(value, str):
+                raise TypeError('name and value must be string')
+            if len(name) > MAX_FIELD_NAME_LENGTH:
+                raise ValueError('name length must be up to {} characters'.format(MAX_FIELD_NAME_LENGTH))
+            if len(value) > MAX_FIELD_VALUE_LENGTH:
+                raise ValueError('value length must be up to {} characters'.format(MAX_FIELD_VALUE_LENGTH))
+            field = object.__new__(EmbedField)
+            set_attr(field, '_name', name)
+            set_attr(field, '_value', value)
+            set_attr(field, '_version', next(_versions))
+        elif isinstance(field, dict):
+            field = EmbedField.from_dict(field)
+        elif not isinstance(field, EmbedField):
+            raise TypeError('fields items must be EmbedField, dict or (name, value) tuple')
+        result.append(field)
+    return result
+
+
+class _StampedEmbed(Embed):
+    """An embed created by an EmbedTemplate, which knows which of its items differ from the template"""
+    __slots__ = ('_template', '_changed')
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.__items__ and name not in self._changed:
+            object.__setattr__(self, '_changed', self._changed + (name,))
+
+
+_encode_field = encoder_for(EmbedField)
+
+
+def _encode_stamped(embed: _StampedEmbed) -> dict:
+    encoded = embed._template._embed._encoded().copy()
+    for key in embed._changed:
+        if key == 'fields':
+            continue
+        value = getattr(embed, '_' + key)
+        if value is None:
+            encoded.pop(key, None)
+        else:
+            encoded[key] = encode_value(value)
+    # the list of fields may be changed in place, so it is always encoded
+    encoded['fields'] = [_encode_field(field) if type(field) is EmbedField else encode_value(field)
+                         for field in embed._fields]
+    return encoded
+
+
+register_encoder(_StampedEmbed, _encode_stamped)
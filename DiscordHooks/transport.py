@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import weakref
+
+from .metrics import Instrumentation, SendEvent, body_size
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+
+
+class Transport:
+    """Pooled HTTP transport for executing webhooks
+
+    Holds a connection pool that is shared between every Hook that uses the transport,
+    so consecutive sends reuse the same keep-alive connections instead of paying for a
+    new TCP connection and TLS handshake each time.
+
+    requests is imported when the first transport is created (by the first send, for the default transport),
+    so building payloads never pays for importing the HTTP stack.
+
+    The transport is thread-safe. Every thread gets its own requests.Session, and all
+    the sessions are mounted on one HTTPAdapter, so the underlying connections are
+    shared between the threads.
+
+    Sends are paced by a RateLimiter, so they wait for their turn in the webhook's
+    rate limit bucket instead of being answered with 429, and the timeouts and retries
+    of failed sends are set by a RetryPolicy. An Instrumentation records the timings of every send.
+
+    Attributes:
+        pool_connections (int): The number of different hosts to keep connection pools for.
+        pool_maxsize (int): The maximum number of connections to keep alive per host.
+        pool_block (bool): True to wait for a free connection when the pool is full,
+            instead of opening a connection that will not be kept.
+        keep_alive (bool): False to close the connection after every request.
+        rate_limiter (RateLimiter): The rate limiter pacing the sends.
+        retry_policy (RetryPolicy): The timeouts and retries of the sends.
+        instrumentation (Instrumentation): Records the timings of every send. None to record nothing.
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, pool_block: bool = False,
+                 keep_alive: bool = True, rate_limiter: RateLimiter = None, retry_policy: RetryPolicy = None,
+                 instrumentation: Instrumentation = None):
+        """Initiate the Transport object
+
+        Args:
+            pool_connections (int): The number of different hosts to keep connection pools for.
+            pool_maxsize (int): The maximum number of connections to keep alive per host.
+            pool_block (bool): True to wait for a free connection when the pool is full.
+            keep_alive (bool): False to close the connection after every request.
+            rate_limiter (RateLimiter): The rate limiter pacing the sends. A new one when not set.
+                Transports that send to the same webhooks should share a rate limiter.
+            retry_policy (RetryPolicy): The timeouts and retries of the sends. The default policy when not set.
+            instrumentation (Instrumentation): Records the timings of every send. None to record nothing.
+        """
+        if not isinstance(pool_connections, int) or pool_connections < 1:
+            raise ValueError('pool_connections must be a positive int')
+        if not isinstance(pool_maxsize, int) or pool_maxsize < 1:
+            raise ValueError('pool_maxsize must be a positive int')
+        if instrumentation is not None and not isinstance(instrumentation, Instrumentation):
+            raise TypeError('instrumentation must be Instrumentation')
+        from requests.adapters import HTTPAdapter
+
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.instrumentation = instrumentation
+
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                    pool_block=pool_block)
+        self._local = threading.local()
+        self._sessions = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def session(self) -> 'requests.Session':
+        """requests.Session: The session of the current thread, bound to the shared pool."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError('the transport is closed')
+                session = requests.Session()
+                session.mount('https://', self._adapter)
+                session.mount('http://', self._adapter)
+                if not self.keep_alive:
+                    session.headers['Connection'] = 'close'
+                self._sessions.add(session)
+            self._local.session = session
+        return session
+
+    def post(self, url: str, data=None, headers: dict = None, event: SendEvent = None) -> 'requests.Response':
+        """Send a POST request over the pooled connections (see request)
+
+        Args:
+            url (str): The url the request will be sent to.
+            data (str): The body of the request.
+            headers (dict): Extra headers of the request.
+            event (SendEvent): The measurements of the send so far, completed and recorded by the instrumentation.
+
+        Returns:
+            requests.Response: The response of the server.
+        """
+        return self.request('POST', url, data, headers, event)
+
+    def request(self, method: str, url: str, data=None, headers: dict = None,
+                event: SendEvent = None) -> 'requests.Response':
+        """Send a request over the pooled connections
+
+        The request waits for its turn in the url's rate limit bucket, and is retried if it is throttled anyway.
+        Connection errors, timeouts and retryable status codes are retried according to the retry policy.
+
+        Args:
+            method (str): The HTTP method of the request (POST, PATCH, DELETE...).
+            url (str): The url the request will be sent to.
+            data (str): The body of the request.
+            headers (dict): Extra headers of the request.
+            event (SendEvent): The measurements of the send so far, completed and recorded by the instrumentation.
+
+        Returns:
+            requests.Response: The response of the server.
+
+        Raises:
+            requests.ConnectionError: If the last attempt failed to connect.
+            requests.Timeout: If the last attempt timed out.
+        """
+        if self.instrumentation is None:
+            return self._request(method, url, data, headers, None)
+
+        if event is None:
+            event = SendEvent(url)
+        event.url = url
+        try:
+            response = self._request(method, url, data, headers, event)
+        except Exception as e:
+            event.exception = e
+            raise
+        else:
+            event.status_code = response.status_code
+            return response
+        finally:
+            self.instrumentation.record(event)
+
+    def _request(self, method: str, url: str, data, headers: dict, event: SendEvent) -> 'requests.Response':
+        from requests import ConnectionError, Timeout
+        policy = self.retry_policy
+        attempts = policy.start(url, self.rate_limiter)
+        size = body_size(data) if event is not None else None
+        while True:
+            delay = self.rate_limiter.reserve(url)
+            if delay > 0:
+                time.sleep(delay)
+                if event is not None:
+                    event.rate_limit_wait += delay
+
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, data=data, headers=headers,
+                                                timeout=(policy.connect_timeout, policy.read_timeout))
+            except (ConnectionError, Timeout) as e:
+                if event is not None:
+                    event.add_attempt(time.perf_counter() - started, size)
+                delay = attempts.next_delay(exception=e)
+                if delay is None:
+                    raise
+            else:
+                if event is not None:
+                    event.add_attempt(time.perf_counter() - started, size)
+                if self.rate_limiter.update(url, response) is not None:
+                    # throttled, the next reserve waits for the bucket, unless that passes the deadline
+                    if attempts.throttle(response, attempts.throttled < self.rate_limiter.max_retries) is None:
+                        return response
+                    continue
+                delay = attempts.next_delay(response=response)
+                if delay is None:
+                    return response
+            time.sleep(delay)
+            if event is not None:
+                event.retry_wait += delay
+
+    def close(self):
+        """Close all the pooled connections
+
+        Note:
+            The transport can't be used after it is closed.
+        """
+        with self._lock:
+            self._closed = True
+            sessions, self._sessions = list(self._sessions), weakref.WeakSet()
+        for session in sessions:
+            session.close()
+        self._adapter.close()
+
+    def __enter__(self) -> 'Transport':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def default_transport() -> Transport:
+    """Get the transport used by hooks that are not bound to one
+
+    The transport is created on the first call and shared by the whole process.
+
+    Returns:
+        Transport: The shared default transport.
+    """
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = Transport()
+    return _default_transport
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the cost of `import DiscordHooks`
+
+Imports the package in fresh interpreters with `python -X importtime`, and reports the median
+cumulative import time of the package, the modules of the package that cost the most, and the heavy
+modules that must not be imported before the first send (the HTTP stack, asyncio, sqlite3).
+
+Exits with 1 when the median is over the budget or one of the lazy modules was imported,
+so it can guard the import cost in CI.
+
+Usage:
+    python benchmarks/bench_import.py [--runs N] [--budget-ms MS] [--top N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# imported on first use only: by the first send, the first AsyncTransport, the first Outbox
+LAZY = ('requests', 'urllib3', 'aiohttp', 'asyncio', 'sqlite3')
+
+
+def import_times() -> (dict, [str]):
+    """Import the package in a fresh interpreter
+
+    Returns:
+        (dict, [str]): The cumulative import time of every module in microseconds,
+            and the lazy modules that were imported.
+    """
+    code = 'import sys, DiscordHooks; print(",".join(m for m in {!r} if m in sys.modules))'.format(LAZY)
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env, check=True,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() == 'site' and not name.startswith('  '):
+            # the modules imported by site are imported before the package, and are not its cost
+            times.clear()
+            continue
+        times[name.strip()] = int(cumulative)
+    return times, [module for module in process.stdout.strip().split(',') if module]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=15, help='fresh interpreters to import the package in')
+    parser.add_argument('--budget-ms', type=float, default=60.0, help='the maximum median import time')
+    parser.add_argument('--top', type=int, default=10, help='the number of costliest modules to show')
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.runs)]
+    totals = [times['DiscordHooks'] / 1000 for times, _ in runs]
+    median = statistics.median(totals)
+
+    modules = {}
+    for times, _ in runs:
+        for name, cumulative in times.items():
+            modules.setdefault(name, []).append(cumulative)
+    costliest = sorted(((statistics.median(values) / 1000, name) for name, values in modules.items()
+                        if name != 'DiscordHooks' and len(values) == args.runs), reverse=True)[:args.top]
+
+    print('import DiscordHooks: median {:.1f} ms, min {:.1f} ms, max {:.1f} ms over {} runs (budget {:.1f} ms)'
+          .format(median, min(totals), max(totals), args.runs, args.budget_ms))
+    print('{:<40} {:>10}'.format('module (cumulative)', 'ms'))
+    for cost, name in costliest:
+        print('{:<40} {:>10.2f}'.format(name, cost))
+
+    imported = sorted({module for _, lazy in runs for module in lazy})
+    if imported:
+        print('imported eagerly: {}'.format(', '.join(imported)))
+    if median > args.budget_ms or imported:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
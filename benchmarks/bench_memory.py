@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the memory held by queued messages
+
+Builds many hooks of 10 embeds each (the most Discord accepts in one message)
+and measures the bytes each one holds with tracemalloc, with the slotted models and with
+subclasses of them that keep their attributes in a per-instance __dict__, as the models did before __slots__.
+
+Usage:
+    python benchmarks/bench_memory.py [--messages N] [--fields N]
+"""
+import argparse
+import gc
+import os
+import struct
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from DiscordHooks import Hook, Embed, EmbedAuthor, EmbedField, EmbedFooter, EmbedThumbnail, Color  # noqa: E402
+
+SLOTTED = (Hook, Embed, EmbedAuthor, EmbedField, EmbedFooter, EmbedThumbnail)
+
+
+class _Unset:
+    """Shadows a slot, so the attribute is set in the __dict__, and is unset until then, like a slot"""
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        raise AttributeError
+
+
+def slots(cls: type) -> set:
+    return {name for base in cls.__mro__ for name in getattr(base, '__slots__', ())}
+
+
+def dict_backed(cls: type) -> type:
+    """Get a subclass of a model that keeps its attributes in a per-instance __dict__
+
+    Note:
+        The instances still carry the slots of the model, empty; measure doesn't count them.
+    """
+    return type(cls.__name__, (cls,), {name: _Unset() for name in slots(cls)})
+
+
+def make_hook(index: int, fields: int, models: dict) -> Hook:
+    hook, embed, author, field, footer, thumbnail = (models[cls] for cls in SLOTTED)
+    return hook(content='message {}'.format(index), embeds=[
+        embed(title='embed {}'.format(i), description='description', timestamp=datetime(2020, 1, 1),
+              color=Color.Aqua, author=author(name='author'), footer=footer(text='footer'),
+              thumbnail=thumbnail(url='https://example.com/thumbnail.png'),
+              fields=[field(name='field', value='value') for _ in range(fields)])
+        for i in range(10)])
+
+
+def measure(messages: int, fields: int, models: dict) -> float:
+    """Get the bytes held per queued message"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    queued = [make_hook(i, fields, models) for i in range(messages)]
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    # the empty slots of the dict-backed subclasses, which the models before __slots__ didn't have
+    shadowed = {cls for cls in models.values() if cls not in SLOTTED}
+    size -= sum(struct.calcsize('P') * len(slots(type(obj))) for obj in gc.get_objects() if type(obj) in shadowed)
+    return size / len(queued)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--fields', type=int, default=5)
+    args = parser.parse_args()
+
+    print('{} messages of 10 embeds with {} fields each'.format(args.messages, args.fields))
+    baseline = measure(args.messages, args.fields, {cls: dict_backed(cls) for cls in SLOTTED})
+    slotted = measure(args.messages, args.fields, {cls: cls for cls in SLOTTED})
+    print('  {:<12} {:>9,.0f} bytes per message'.format('__dict__', baseline))
+    print('  {:<12} {:>9,.0f} bytes per message ({:.0%})'.format('__slots__', slotted, slotted / baseline - 1))
+
+
+if __name__ == '__main__':
+    main()
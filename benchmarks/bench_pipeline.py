@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of building and serializing messages in a ProcessPipeline
+
+Builds the same embed-heavy messages in this process, and in pipelines of 1 to N worker processes,
+and reports the payloads per second of each, to show how the build scales with the cores.
+Nothing is sent; the send path is measured by bench_suite.py.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--records N] [--processes 1,2,4] [--chunk-size N]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from DiscordHooks import Hook, Embed, EmbedField, EmbedFooter, Color, ProcessPipeline  # noqa: E402
+
+
+def build(index: int) -> Hook:
+    return Hook(content='report {}'.format(index), embeds=[
+        Embed(title='section {}'.format(i), description='line\n' * 20, color=Color.Blue, timestamp=datetime(2020, 1, 1),
+              footer=EmbedFooter(text='nightly report'),
+              fields=[EmbedField(name='metric {}'.format(j), value=str(index * j)) for j in range(25)])
+        for i in range(4)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--processes', default='1,2,4,{}'.format(os.cpu_count() or 1),
+                        help='comma separated numbers of worker processes')
+    parser.add_argument('--chunk-size', type=int, default=100)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    for index in range(args.records):
+        build(index).json
+    base = args.records / (time.perf_counter() - started)
+    print('{} cores, {} records'.format(os.cpu_count(), args.records))
+    print('{:<16} {:>14} {:>10}'.format('case', 'payloads/s', 'speedup'))
+    print('{:<16} {:>14.0f} {:>10.2f}'.format('in process', base, 1.0))
+
+    for processes in sorted({int(n) for n in args.processes.split(',')}):
+        with ProcessPipeline(build, processes=processes, chunk_size=args.chunk_size) as pipeline:
+            # the first chunks start the processes, they are not part of the measurement
+            sum(1 for _ in pipeline.payloads(range(processes * args.chunk_size)))
+            started = time.perf_counter()
+            count = sum(1 for _ in pipeline.payloads(range(args.records)))
+            rate = count / (time.perf_counter() - started)
+        print('{:<16} {:>14.0f} {:>10.2f}'.format('{} processes'.format(processes), rate, rate / base))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the latency of critical messages while bulk traffic saturates a webhook
+
+Queues a bulk run of LOW priority messages to one webhook of a local MockDiscordServer, more than its
+rate limit bucket can send during the run, and then sends a CRITICAL message every `--interval` seconds,
+through the same Dispatcher and with Hook.execute directly. Reports the latency of every lane and the
+fraction of the critical messages that met the SLO, with priority lanes and with every message in one FIFO lane.
+
+Usage:
+    python benchmarks/bench_priority.py [--bulk N] [--critical N] [--interval S] [--bucket-limit N] [--slo S]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from DiscordHooks import Hook, Dispatcher, MetricsCollector, RateLimiter, SendEvent, Transport  # noqa: E402
+from DiscordHooks.mock_server import MockDiscordServer  # noqa: E402
+
+
+def run(server: MockDiscordServer, args, lanes: bool) -> (dict, dict):
+    """Send the bulk run and the critical messages
+
+    Returns:
+        (dict, dict): The snapshot of the metrics, and the latencies of the bulk, critical and direct sends.
+    """
+    url = server.webhook_url(webhook_id=2 if lanes else 1)
+    metrics = MetricsCollector(slo={Dispatcher.CRITICAL: args.slo})
+    transport = Transport(pool_maxsize=args.workers, rate_limiter=RateLimiter(global_limit=None),
+                          instrumentation=metrics)
+    bulk, critical = (Dispatcher.LOW, Dispatcher.CRITICAL) if lanes else (Dispatcher.NORMAL, Dispatcher.NORMAL)
+    latencies = {'bulk': [], 'critical': [], 'direct': []}
+
+    def submit(dispatcher: Dispatcher, hook: Hook, priority: str, kind: str):
+        started = time.perf_counter()
+        future = dispatcher.submit(hook, url, priority=priority)
+        future.add_done_callback(lambda _: latencies[kind].append(time.perf_counter() - started))
+
+    with transport, Dispatcher(transport, workers=args.workers, maxsize=args.bulk + args.critical) as dispatcher:
+        for index in range(args.bulk):
+            submit(dispatcher, Hook(content='bulk {}'.format(index)), bulk, 'bulk')
+        for index in range(args.critical):
+            time.sleep(args.interval)
+            submit(dispatcher, Hook(content='alert {}'.format(index)), critical, 'critical')
+            started = time.perf_counter()
+            Hook(content='direct alert {}'.format(index)).execute(url, transport=transport,
+                                                                  event=SendEvent(priority='direct'))
+            latencies['direct'].append(time.perf_counter() - started)
+        dispatcher.flush()
+    return metrics.snapshot(), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bulk', type=int, default=150, help='bulk messages queued before the critical ones')
+    parser.add_argument('--critical', type=int, default=10, help='critical messages sent during the run')
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds between the critical messages')
+    parser.add_argument('--bucket-limit', type=int, default=10, help='sends per second of the webhook')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--slo', type=float, default=1.5, help='latency objective of the critical lane, seconds')
+    args = parser.parse_args()
+
+    with MockDiscordServer(bucket_limit=args.bucket_limit, bucket_window=1.0, keep=0) as server:
+        print('{} bulk messages, {} critical messages every {}s, {} sends/s, SLO {}s'.format(
+            args.bulk, args.critical, args.interval, args.bucket_limit, args.slo))
+        print('{:<8} {:<10} {:>7} {:>9} {:>9} {:>9}'.format('mode', 'messages', 'count', 'p50 s', 'max s', 'SLO met'))
+        for name, lanes in (('fifo', False), ('lanes', True)):
+            snapshot, latencies = run(server, args, lanes)
+            for kind, values in latencies.items():
+                met = sum(value <= args.slo for value in values) / len(values)
+                print('{:<8} {:<10} {:>7} {:>9.3f} {:>9.3f} {:>9.0%}'.format(
+                    name, kind, len(values), statistics.median(values), max(values), met))
+            if lanes:
+                lane = snapshot['lanes'][Dispatcher.CRITICAL]
+                print('MetricsCollector critical lane: p99 {:.3f}s, SLO met {:.0%}'.format(
+                    lane['p99'], lane['slo_met']))
+
+
+if __name__ == '__main__':
+    main()
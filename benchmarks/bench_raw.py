@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the raw send path against sending json strings
+
+Prepares the same embed-heavy payload as a json string (Hook.execute(json_obj=...)), as bytes,
+as a memoryview, and as bytes with 1% and 100% of the payloads validated, and reports the
+microseconds of preparing one request body in each case. Then sends the payloads to a local
+MockDiscordServer and reports the messages per second of the string and the raw paths.
+
+Usage:
+    python benchmarks/bench_raw.py [--number N] [--sends N] [--embeds N]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from DiscordHooks import Hook, Embed, EmbedField, EmbedFooter, EmbedImage, Color  # noqa: E402
+from DiscordHooks import RateLimiter, RawSender, Transport  # noqa: E402
+from DiscordHooks.mock_server import MockDiscordServer  # noqa: E402
+
+
+def make_json(embeds: int) -> str:
+    """Make the payload of an upstream service, with items Discord knows and the models don't"""
+    payload = json.loads(Hook(content='report', embeds=[
+        Embed(title='section {}'.format(i), description='line\n' * 20, color=Color.Blue,
+              image=EmbedImage(url='https://example.com/chart.png'), footer=EmbedFooter(text='nightly'),
+              fields=[EmbedField(name='metric {}'.format(j), value='value ' * 5) for j in range(20)])
+        for i in range(embeds)]).json)
+    for embed in payload['embeds']:
+        embed['type'] = 'rich'
+        embed['image'].update(width=640, height=480)
+        embed['footer']['proxy_icon_url'] = 'https://example.com/icon.png'
+        for field in embed['fields']:
+            field['inline'] = True
+    return json.dumps(payload, separators=(',', ':'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000, help='bodies prepared in every case')
+    parser.add_argument('--sends', type=int, default=2000, help='messages sent in every send case')
+    parser.add_argument('--embeds', type=int, default=4, help='embeds in the payload')
+    args = parser.parse_args()
+
+    json_obj = make_json(args.embeds)
+    payload = json_obj.encode('utf-8')
+    view = memoryview(bytearray(payload))
+    hook = Hook()
+    url = 'http://127.0.0.1/api/webhooks/1/token'
+    trusted = RawSender(url)
+    cases = [
+        ('json string', lambda: hook._body(json_obj)),
+        ('bytes', lambda: trusted._prepare(payload, None, 'application/json', False)),
+        ('memoryview', lambda: trusted._prepare(view, None, 'application/json', False)),
+    ]
+    for validate in (0.01, 1.0):
+        sender = RawSender(url, validate=validate, seed=0)
+        cases.append(('bytes, {:g}% validated'.format(validate * 100),
+                      lambda sender=sender: sender._prepare(payload, None, 'application/json', False)))
+
+    # the validated cases must accept the payload, or they would measure the failure
+    trusted.check(payload)
+    print('payload of {} bytes'.format(len(payload)))
+    print('{:<28} {:>12}'.format('prepare', 'us'))
+    for name, case in cases:
+        seconds = min(timeit.repeat(case, number=args.number, repeat=3)) / args.number
+        print('{:<28} {:>12.2f}'.format(name, seconds * 1e6))
+
+    with MockDiscordServer(bucket_limit=1000000, bucket_window=1.0, keep=0) as server, \
+            Transport(rate_limiter=RateLimiter(global_limit=None)) as transport:
+        url = server.webhook_url()
+        sender = RawSender(url, transport)
+        sends = [
+            ('Hook.execute(json string)', lambda: Hook(hook_url=url, transport=transport).execute(json_obj=json_obj)),
+            ('RawSender.send(bytes)', lambda: sender.send(payload)),
+        ]
+        print('{:<28} {:>12}'.format('send', 'messages/s'))
+        for name, send in sends:
+            seconds = min(timeit.repeat(send, number=args.sends, repeat=3)) / args.sends
+            print('{:<28} {:>12.0f}'.format(name, 1 / seconds))
+
+
+if __name__ == '__main__':
+    main()
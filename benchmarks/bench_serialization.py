@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of Hook.json on embeds with 25 fields
+
+Compares the generated per-class encoders (and the fastest installed json backend)
+with the original getattr based serialization through json.dumps(default=...).
+
+Usage:
+    python benchmarks/bench_serialization.py [--embeds N] [--number N]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from DiscordHooks import Hook, Embed, EmbedAuthor, EmbedField, EmbedFooter, Color  # noqa: E402
+from DiscordHooks import serializer  # noqa: E402
+from DiscordHooks.embed import BaseSerializable  # noqa: E402
+
+
+def legacy_encode(obj):
+    if isinstance(obj, BaseSerializable):
+        return obj.dict
+    elif isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(repr(obj) + " is not JSON serializable")
+
+
+def legacy_json(hook: Hook) -> str:
+    data = {key: getattr(hook, key) for key in hook.__items__ if getattr(hook, key) is not None}
+    return json.dumps(data, default=legacy_encode)
+
+
+def make_hook(embeds: int) -> Hook:
+    return Hook(content='benchmark', username='bench', embeds=[
+        Embed(title='embed {}'.format(i), description='description ' * 20, url='https://example.com',
+              timestamp=datetime(2020, 1, 1), color=Color.Aqua, author=EmbedAuthor(name='author'),
+              footer=EmbedFooter(text='footer'),
+              fields=[EmbedField(name='field {}'.format(j), value='value {}'.format(j)) for j in range(25)])
+        for i in range(embeds)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--embeds', type=int, default=10)
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    hook = make_hook(args.embeds)
+    assert json.loads(hook.json) == json.loads(legacy_json(hook))
+
+    def uncached():
+        # setting an item invalidates the cached json, so every call serializes again
+        hook.content = 'benchmark'
+        return hook.json
+
+    legacy = timeit.timeit(lambda: legacy_json(hook), number=args.number) / args.number
+    fast = timeit.timeit(uncached, number=args.number) / args.number
+    cached = timeit.timeit(lambda: hook.json, number=args.number) / args.number
+
+    print('Hook.json with {} embeds of 25 fields (json backend: {})'.format(args.embeds, serializer.BACKEND))
+    print('  legacy getattr + json.dumps: {:8.1f} us'.format(legacy * 1e6))
+    print('  generated encoders:          {:8.1f} us  ({:.1f}x)'.format(fast * 1e6, legacy / fast))
+    print('  cached:                      {:8.1f} us  ({:.1f}x)'.format(cached * 1e6, legacy / cached))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""Benchmark suite of the models, the serialization and the send pipeline
+
+Runs every case, timing each operation on its own, and reports the p50/p90/p99 latency
+and the throughput (operations per second) of each case:
+    construction of Embed and Hook objects,
+    from_dict on nested dicts (and a Hook built from them),
+    Hook.json with 1 to 10 embeds of 25 fields,
+    Hook.execute against a local MockDiscordServer, sequential, threaded and async.
+
+The mock server runs in its own process, and has a huge rate limit bucket, and the transports
+have no global limit, so the send cases measure the pipeline, not the pacing.
+
+Usage:
+    python benchmarks/bench_suite.py [--number N] [--sends N] [--threads N] [--concurrency N]
+                                     [--only NAME] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from DiscordHooks import Hook, Embed, EmbedAuthor, EmbedField, EmbedFooter, EmbedThumbnail, Color  # noqa: E402
+from DiscordHooks import Transport, RateLimiter, serializer  # noqa: E402
+from DiscordHooks.mock_server import MockDiscordServer  # noqa: E402
+
+
+def make_embed(index: int, fields: int = 25) -> Embed:
+    return Embed(title='embed {}'.format(index), description='description ' * 10, url='https://example.com',
+                 timestamp=datetime(2020, 1, 1), color=Color.Aqua, author=EmbedAuthor(name='author'),
+                 footer=EmbedFooter(text='footer'), thumbnail=EmbedThumbnail(url='https://example.com/t.png'),
+                 fields=[EmbedField(name='field {}'.format(j), value='value {}'.format(j)) for j in range(fields)])
+
+
+def make_hook(embeds: int, url: str = None) -> Hook:
+    return Hook(hook_url=url, content='benchmark', username='bench', embeds=[make_embed(i) for i in range(embeds)])
+
+
+class Result:
+    """The timings of one benchmark case"""
+
+    def __init__(self, name: str, latencies: [float], elapsed: float):
+        self.name = name
+        self.latencies = sorted(latencies)
+        self.elapsed = elapsed
+
+    def percentile(self, q: float) -> float:
+        index = min(len(self.latencies) - 1, max(0, int(round(q / 100 * len(self.latencies))) - 1))
+        return self.latencies[index]
+
+    @property
+    def throughput(self) -> float:
+        return len(self.latencies) / self.elapsed
+
+    def as_dict(self) -> dict:
+        return {'name': self.name, 'count': len(self.latencies), 'p50_us': self.percentile(50) * 1e6,
+                'p90_us': self.percentile(90) * 1e6, 'p99_us': self.percentile(99) * 1e6,
+                'ops_per_second': self.throughput}
+
+    def __str__(self):
+        return '{:<32} {:>8} {:>12.1f} {:>12.1f} {:>12.1f} {:>14.0f}'.format(
+            self.name, len(self.latencies), self.percentile(50) * 1e6, self.percentile(90) * 1e6,
+            self.percentile(99) * 1e6, self.throughput)
+
+
+def measure(name: str, operation: callable, number: int, warmup: int = 10) -> Result:
+    for _ in range(warmup):
+        operation()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(number):
+        start = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - start)
+    return Result(name, latencies, time.perf_counter() - started)
+
+
+def bench_models(number: int) -> [Result]:
+    embed_dict = make_embed(0).dict
+    embed_dict['author'] = embed_dict['author'].dict
+    embed_dict['footer'] = embed_dict['footer'].dict
+    embed_dict['thumbnail'] = embed_dict['thumbnail'].dict
+    embed_dict['fields'] = [field.dict for field in embed_dict['fields']]
+    hook_dict = {'content': 'benchmark', 'username': 'bench', 'embeds': [embed_dict] * 10}
+
+    return [
+        measure('Embed() 25 fields', lambda: make_embed(0), number),
+        measure('Hook() 10 embeds', lambda: make_hook(10), number // 10 or 1),
+        measure('Embed.from_dict 25 fields', lambda: Embed.from_dict(embed_dict), number),
+        measure('Hook(**dict) 10 embeds', lambda: Hook(**hook_dict), number // 10 or 1),
+    ]
+
+
+def bench_json(number: int) -> [Result]:
+    results = []
+    for embeds in (1, 2, 5, 10):
+        hook = make_hook(embeds)
+
+        def uncached():
+            # setting an item invalidates the cached json, so every call serializes again
+            hook.content = 'benchmark'
+            return hook.json
+
+        results.append(measure('Hook.json {} embeds'.format(embeds), uncached, number))
+    return results
+
+
+def _serve(port_queue):
+    server = MockDiscordServer(bucket_limit=1000000, bucket_window=1.0, keep=0)
+    port_queue.put(server.port)
+    server.serve_forever()
+
+
+def start_server() -> (multiprocessing.Process, str):
+    # the server runs in its own process, so it doesn't compete with the benchmark for the GIL
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(port_queue,), daemon=True)
+    process.start()
+    return process, 'http://127.0.0.1:{}/api/webhooks/1/token'.format(port_queue.get(timeout=10))
+
+
+def bench_execute(url: str, sends: int, threads: int, concurrency: int) -> [Result]:
+    hook = make_hook(1, url)
+    json_obj = hook.json
+    results = []
+
+    with Transport(pool_maxsize=threads, rate_limiter=RateLimiter(global_limit=None)) as transport:
+        results.append(measure('execute sequential', lambda: hook.execute(json_obj=json_obj, transport=transport),
+                               sends))
+
+        def timed(_):
+            start = time.perf_counter()
+            hook.execute(json_obj=json_obj, transport=transport)
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(timed, range(threads)))
+            started = time.perf_counter()
+            latencies = list(executor.map(timed, range(sends)))
+            results.append(Result('execute {} threads'.format(threads), latencies, time.perf_counter() - started))
+
+    try:
+        from DiscordHooks import AsyncTransport
+        results.append(asyncio.run(_bench_execute_async(AsyncTransport, hook, json_obj, sends, concurrency)))
+    except ImportError:
+        print('aiohttp is not installed, skipping the async case', file=sys.stderr)
+    return results
+
+
+async def _bench_execute_async(transport_class, hook: Hook, json_obj: str, sends: int, concurrency: int) -> Result:
+    transport = transport_class(rate_limiter=RateLimiter(global_limit=None))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed():
+        async with semaphore:
+            start = time.perf_counter()
+            await hook.execute_async(json_obj=json_obj, transport=transport)
+            return time.perf_counter() - start
+
+    try:
+        # one send first, so the rate limiter learns the huge bucket before the concurrent sends
+        await timed()
+        await asyncio.gather(*(timed() for _ in range(concurrency)))
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(timed() for _ in range(sends)))
+        return Result('execute async x{}'.format(concurrency), latencies, time.perf_counter() - started)
+    finally:
+        await transport.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=1000, help='operations per model/json case')
+    parser.add_argument('--sends', type=int, default=2000, help='sends per execute case')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=32, help='sends in flight in the async case')
+    parser.add_argument('--only', choices=('models', 'json', 'execute'), help='run only one group of cases')
+    parser.add_argument('--output', help='write the results to this json file')
+    args = parser.parse_args()
+
+    results = []
+    if args.only in (None, 'models'):
+        results += bench_models(args.number)
+    if args.only in (None, 'json'):
+        results += bench_json(args.number)
+    if args.only in (None, 'execute'):
+        server, url = start_server()
+        try:
+            results += bench_execute(url, args.sends, args.threads, args.concurrency)
+        finally:
+            server.terminate()
+
+    print('python {} on {}, json backend: {}'.format(platform.python_version(), platform.platform(),
+                                                     serializer.BACKEND))
+    print('{:<32} {:>8} {:>12} {:>12} {:>12} {:>14}'.format('case', 'count', 'p50 us', 'p90 us', 'p99 us', 'ops/s'))
+    for result in results:
+        print(result)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(),
+                       'json_backend': serializer.BACKEND, 'time': datetime.now().isoformat(),
+                       'results': [result.as_dict() for result in results]}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of stamping embeds from an EmbedTemplate
+
+Compares building every message from scratch (all the setters and the whole serialization)
+with stamping it from a template that holds the invariant color, author, footer and thumbnail.
+
+Usage:
+    python benchmarks/bench_template.py [--fields N] [--number N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from DiscordHooks import Hook, Embed, EmbedAuthor, EmbedField, EmbedFooter, EmbedThumbnail, EmbedTemplate  # noqa
+from DiscordHooks import Color  # noqa: E402
+
+STATIC = dict(title='Service monitor', url='https://status.example.com', color=Color.Orange)
+
+
+def from_scratch(i: int, fields: int) -> str:
+    embed = Embed(description='event number {}'.format(i),
+                  author=EmbedAuthor(name='monitor', url='https://example.com', icon_url='https://example.com/a.png'),
+                  footer=EmbedFooter(text='production cluster', icon_url='https://example.com/f.png'),
+                  thumbnail=EmbedThumbnail(url='https://example.com/t.png'),
+                  fields=[EmbedField(name='key {}'.format(j), value='value {}'.format(i)) for j in range(fields)],
+                  **STATIC)
+    return Hook(embeds=[embed]).json
+
+
+def stamped(template: EmbedTemplate, i: int, fields: int) -> str:
+    embed = template.stamp(description='event number {}'.format(i),
+                           fields=[('key {}'.format(j), 'value {}'.format(i)) for j in range(fields)])
+    return Hook(embeds=[embed]).json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fields', type=int, default=2)
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    template = EmbedTemplate(
+        author=EmbedAuthor(name='monitor', url='https://example.com', icon_url='https://example.com/a.png'),
+        footer=EmbedFooter(text='production cluster', icon_url='https://example.com/f.png'),
+        thumbnail=EmbedThumbnail(url='https://example.com/t.png'), **STATIC)
+    assert json.loads(from_scratch(7, args.fields)) == json.loads(stamped(template, 7, args.fields))
+
+    started = time.perf_counter()
+    for i in range(args.number):
+        from_scratch(i, args.fields)
+    scratch = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(args.number):
+        stamped(template, i, args.fields)
+    stamp = time.perf_counter() - started
+
+    print('Build and serialize {} messages with {} changing fields'.format(args.number, args.fields))
+    print('  from scratch: {:10.0f} msgs/s'.format(args.number / scratch))
+    print('  template:     {:10.0f} msgs/s  ({:.1f}x)'.format(args.number / stamp, scratch / stamp))
+
+
+if __name__ == '__main__':
+    main()
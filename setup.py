@@ -4,6 +4,8 @@ setup(
     name='DiscordHooks',
     version='1.0',
     packages=['DiscordHooks'],
+    install_requires=['requests'],
+    extras_require={'async': ['aiohttp'], 'fast': ['orjson']},
     url='https://github.com/MeitarR/DiscordHooks',
     license='',
     author='MeitarR',